@@ -1,18 +1,94 @@
 """Utilities for enriching changelog entries with OpenAI."""
 from __future__ import annotations
 
+import json
 import logging
-import os
-from typing import Any, Optional
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, TypeVar
 
 try:
-    from openai import OpenAI
+    from openai import APIConnectionError, APITimeoutError, OpenAI, RateLimitError
 except ImportError:  # pragma: no cover - optional dependency path
     OpenAI = None  # type: ignore
+    _TRANSIENT_OPENAI_ERRORS: Tuple[type, ...] = ()
+else:
+    _TRANSIENT_OPENAI_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError)
+
+try:
+    import requests
+except ImportError:  # pragma: no cover - optional dependency path
+    requests = None  # type: ignore[assignment]
+
+from .config import get_config
+from .llm_cache import cached_call
+from .rate_limit import RateLimiter, limiter_from_env
 
 LOGGER = logging.getLogger(__name__)
 
 CATEGORY_CHOICES = ("feature", "fix", "change")
+MODEL = "gpt-4o-mini"
+RESPONSES_URL = "https://api.openai.com/v1/responses"
+# Common synonyms or phrases the model may answer with instead of a canonical category.
+CATEGORY_SYNONYMS: Mapping[str, str] = MappingProxyType({
+    "bug": "fix",
+    "bugfix": "fix",
+    "bug fix": "fix",
+    "hotfix": "fix",
+    "fixes": "fix",
+    "feature addition": "feature",
+    "new feature": "feature",
+    "enhancement": "change",
+    "improvement": "change",
+    "maintenance": "change",
+    "refactor": "change",
+    "refactoring": "change",
+    "chore": "change",
+    "docs": "change",
+})
+# Canonical categories and synonyms in one table so the common exact answers cost a single lookup.
+_CATEGORY_LOOKUP: Mapping[str, str] = MappingProxyType(
+    {**{choice: choice for choice in CATEGORY_CHOICES}, **CATEGORY_SYNONYMS}
+)
+# Longest keywords first so overlapping phrases ("bug fix" vs "bug") resolve to the more specific one.
+_SYNONYM_PATTERN = re.compile("|".join(map(re.escape, sorted(CATEGORY_SYNONYMS, key=len, reverse=True))))
+ENTRY_FORMAT: Dict[str, Any] = {
+    "format": {
+        "type": "json_schema",
+        "name": "changelog_entry",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "description": {"type": "string"},
+                "category": {"type": "string", "enum": list(CATEGORY_CHOICES)},
+            },
+            "required": ["description", "category"],
+            "additionalProperties": False,
+        },
+    }
+}
+ENTRY_MAX_OUTPUT_TOKENS = 160
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 10.0
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _HTTPResponse:
+    """Minimal stand-in for the SDK response object, readable by ``_first_text``."""
+
+    data: List[Dict[str, Any]] = field(default_factory=list)
+    output_text: Optional[str] = None
 
 
 def enhance_description(title: str, ticket_id: str) -> str:
@@ -21,16 +97,15 @@ def enhance_description(title: str, ticket_id: str) -> str:
     When the OpenAI client is unavailable or misconfigured the original title is returned unchanged.
     """
 
-    api_key = os.getenv("OPENAI_API_KEY")
+    api_key = get_config().openai_api_key
     if not api_key:
         LOGGER.debug("OPENAI_API_KEY not set; skipping AI enrichment")
         return title
 
-    if OpenAI is None:
+    if OpenAI is None and not _fast_http_enabled():
         LOGGER.warning("openai package not installed; cannot use AI enrichment")
         return title
 
-    client = OpenAI(api_key=api_key)
     prompt = (
         "You are helping to craft terse changelog entries. "
         "Rewrite the following Jira ticket title so it is a single concise release-note sentence "
@@ -39,16 +114,11 @@ def enhance_description(title: str, ticket_id: str) -> str:
     )
 
     try:
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=prompt,
-            max_output_tokens=120,
-        )
+        enriched = _complete(api_key, prompt, max_output_tokens=120)
     except Exception as exc:  # pragma: no cover - network/runtime issues
         LOGGER.warning("OpenAI request failed for %s: %s", ticket_id, exc)
         return title
 
-    enriched = _first_text(response)
     if not enriched:
         LOGGER.debug("OpenAI returned empty response for %s", ticket_id)
         return title
@@ -56,19 +126,198 @@ def enhance_description(title: str, ticket_id: str) -> str:
     return enriched.strip()
 
 
+def enrich_and_classify(title: str, ticket_id: str, context: str = "") -> Tuple[str, Optional[str]]:
+    """Rewrite the title and classify the change with a single structured OpenAI call.
+
+    Returns the (possibly unchanged) title together with feature/fix/change, or ``None`` when no
+    category could be determined.
+    """
+
+    api_key = get_config().openai_api_key
+    if not api_key:
+        LOGGER.debug("OPENAI_API_KEY not set; skipping AI enrichment")
+        return title, None
+
+    if OpenAI is None and not _fast_http_enabled():
+        LOGGER.warning("openai package not installed; cannot use AI enrichment")
+        return title, None
+
+    prompt = _entry_prompt(title, ticket_id, context)
+
+    try:
+        text = _complete(api_key, prompt, max_output_tokens=ENTRY_MAX_OUTPUT_TOKENS, text_format=ENTRY_FORMAT)
+    except Exception as exc:  # pragma: no cover - network/runtime issues
+        LOGGER.warning("OpenAI request failed for %s: %s", ticket_id, exc)
+        return title, None
+
+    if not text:
+        LOGGER.debug("OpenAI returned empty response for %s", ticket_id)
+        return title, None
+
+    return _parse_entry(text, title, ticket_id)
+
+
+def enrich_and_classify_many(
+    items: Sequence[Tuple[str, str, str]],
+    concurrency: int = 16,
+) -> List[Tuple[str, Optional[str]]]:
+    """Run ``enrich_and_classify`` for ``(title, ticket_id, context)`` triples concurrently."""
+
+    return _map_concurrently(lambda item: enrich_and_classify(*item), items, concurrency)
+
+
+def enrich_and_classify_batch(
+    items: Sequence[Tuple[str, str, str]],
+    *,
+    poll_interval: float = 5.0,
+    max_poll_interval: float = 60.0,
+) -> List[Tuple[str, Optional[str]]]:
+    """Enrich ``(title, ticket_id, context)`` triples through the OpenAI Batch API.
+
+    Intended for bulk rebuilds: the batch is billed at a discount and uses its own rate-limit pool,
+    at the cost of waiting for the job to finish. Items without a usable result keep their title.
+    """
+
+    results: List[Tuple[str, Optional[str]]] = [(title, None) for title, _, _ in items]
+    if not items:
+        return results
+
+    api_key = get_config().openai_api_key
+    if not api_key:
+        LOGGER.debug("OPENAI_API_KEY not set; skipping AI enrichment")
+        return results
+
+    if OpenAI is None:
+        LOGGER.warning("openai package not installed; cannot submit batch enrichment")
+        return results
+
+    lines = []
+    for index, (title, ticket_id, context) in enumerate(items):
+        body = {
+            "model": MODEL,
+            "input": _entry_prompt(title, ticket_id, context),
+            "max_output_tokens": ENTRY_MAX_OUTPUT_TOKENS,
+            "text": ENTRY_FORMAT,
+        }
+        lines.append(json.dumps({"custom_id": str(index), "method": "POST", "url": "/v1/responses", "body": body}))
+
+    client = _get_client(api_key)
+    try:
+        input_file = client.files.create(
+            file=("smart-changelog-batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        LOGGER.info("Submitted OpenAI batch %s with %d requests", batch.id, len(lines))
+
+        delay = poll_interval
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+            batch = client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            LOGGER.warning("OpenAI batch %s finished with status %s", batch.id, batch.status)
+            return results
+
+        output = client.files.content(batch.output_file_id).text
+    except Exception as exc:  # pragma: no cover - network/runtime issues
+        LOGGER.warning("OpenAI batch request failed: %s", exc)
+        return results
+
+    for raw_line in output.splitlines():
+        if not raw_line.strip():
+            continue
+        try:
+            record = json.loads(raw_line)
+            index = int(record["custom_id"])
+            body = record["response"]["body"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        if not 0 <= index < len(items) or not isinstance(body, dict):
+            continue
+        title, ticket_id, _ = items[index]
+        output_items = body.get("output")
+        text = _first_text(
+            _HTTPResponse(data=[item for item in output_items if isinstance(item, dict)])
+            if isinstance(output_items, list)
+            else _HTTPResponse()
+        )
+        if text:
+            results[index] = _parse_entry(text, title, ticket_id)
+
+    return results
+
+
+def _entry_prompt(title: str, ticket_id: str, context: str) -> str:
+    """Prompt for the combined rewrite-and-classify request."""
+    prompt = (
+        "You are helping to craft terse changelog entries. "
+        "Rewrite the following Jira ticket title so it is a single concise release-note sentence "
+        "without losing important context. Avoid markdown or bullet prefixes. "
+        "Also classify the change as one of: feature, fix, change. "
+        "feature = new functionality or capabilities, fix = bug fixes or defect resolution, "
+        "change = enhancements, maintenance, refactors, chores, or other adjustments.\n"
+        f"Ticket: {ticket_id}\nTitle: {title}\n"
+    )
+    if context:
+        prompt += f"Context:\n{context}\n"
+    return prompt
+
+
+def _parse_entry(text: str, title: str, ticket_id: str) -> Tuple[str, Optional[str]]:
+    """Decode the structured ``{description, category}`` payload, keeping ``title`` on failure."""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        LOGGER.debug("OpenAI returned non-JSON entry for %s", ticket_id)
+        return title, None
+
+    if not isinstance(payload, dict):
+        return title, None
+
+    description = payload.get("description")
+    category = payload.get("category")
+    enriched = description.strip() if isinstance(description, str) and description.strip() else title
+    return enriched, _normalise_category(category) if isinstance(category, str) else None
+
+
+def _map_concurrently(fn: Callable[[T], R], items: Sequence[T], concurrency: int) -> List[R]:
+    """Apply ``fn`` across ``items`` in a bounded thread pool, preserving input order."""
+
+    if not items:
+        return []
+
+    workers = max(1, min(concurrency, len(items)))
+    if workers == 1:
+        return [fn(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fn, items))
+
+
+def suggest_categories_many(contexts: Sequence[str], concurrency: int = 16) -> List[Optional[str]]:
+    """Classify several contexts concurrently, preserving input order; empty contexts yield ``None``."""
+
+    return _map_concurrently(lambda context: suggest_category(context) if context else None, contexts, concurrency)
+
+
 def suggest_category(context: str) -> Optional[str]:
     """Classify the change category using OpenAI, returning feature/fix/change when possible."""
 
-    api_key = os.getenv("OPENAI_API_KEY")
+    api_key = get_config().openai_api_key
     if not api_key:
         LOGGER.debug("OPENAI_API_KEY not set; skipping AI categorisation")
         return None
 
-    if OpenAI is None:
+    if OpenAI is None and not _fast_http_enabled():
         LOGGER.warning("openai package not installed; cannot classify category")
         return None
 
-    client = OpenAI(api_key=api_key)
     prompt = (
         "You are classifying software changes for a changelog. "
         "Choose the best matching category from this list: feature, fix, change. "
@@ -79,22 +328,155 @@ def suggest_category(context: str) -> Optional[str]:
     )
 
     try:
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=prompt,
-            max_output_tokens=10,
-        )
+        text = _complete(api_key, prompt, max_output_tokens=10, stream_until=_normalise_category)
     except Exception as exc:  # pragma: no cover - network/runtime issues
         LOGGER.warning("OpenAI category request failed: %s", exc)
         return None
 
-    text = _first_text(response)
     if not text:
         return None
 
     return _normalise_category(text)
 
 
+@lru_cache(maxsize=1)
+def _get_client(api_key: str) -> Any:
+    """Return a shared OpenAI client so every request reuses one HTTP connection pool."""
+    return OpenAI(api_key=api_key)
+
+
+@lru_cache(maxsize=1)
+def _get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide limiter shared by all threads, configured via SMART_CHANGELOG_RPM/TPM."""
+    return limiter_from_env()
+
+
+def _fast_http_enabled() -> bool:
+    """Whether ``SMART_CHANGELOG_FAST_HTTP=1`` requests the direct HTTP path over the SDK."""
+    return get_config().fast_http and requests is not None
+
+
+@lru_cache(maxsize=1)
+def _get_http_session() -> Any:
+    """Return a shared ``requests`` session for direct Responses API calls."""
+    return requests.Session()
+
+
+def _responses_create_http(
+    api_key: str,
+    prompt: str,
+    max_output_tokens: int,
+    text_format: Optional[Dict[str, Any]] = None,
+) -> _HTTPResponse:
+    """POST to the Responses endpoint directly, skipping the SDK's per-request overhead."""
+
+    body: Dict[str, Any] = {"model": MODEL, "input": prompt, "max_output_tokens": max_output_tokens}
+    if text_format:
+        body["text"] = text_format
+    response = _get_http_session().post(
+        RESPONSES_URL,
+        headers={"Authorization": f"Bearer {api_key}"},
+        json=body,
+        timeout=30,
+    )
+    response.raise_for_status()
+    payload = response.json() or {}
+    output = payload.get("output")
+    return _HTTPResponse(
+        data=[item for item in output if isinstance(item, dict)] if isinstance(output, list) else [],
+        output_text=payload.get("output_text"),
+    )
+
+
+def _complete(
+    api_key: str,
+    prompt: str,
+    *,
+    max_output_tokens: int,
+    text_format: Optional[Dict[str, Any]] = None,
+    stream_until: Optional[Callable[[str], Any]] = None,
+) -> Optional[str]:
+    """Run a single Responses call, served from the on-disk cache when the prompt was seen before.
+
+    With ``stream_until`` the SDK response is streamed and abandoned as soon as the text received so
+    far satisfies the predicate, instead of waiting for the full generation.
+    """
+
+    def request() -> Optional[str]:
+        return _with_retries(send)
+
+    def send() -> Optional[str]:
+        limiter = _get_rate_limiter()
+        if limiter is not None:
+            # Rough token estimate: ~4 characters per prompt token plus the output budget.
+            limiter.acquire(len(prompt) // 4 + max_output_tokens)
+        if _fast_http_enabled():
+            return _first_text(_responses_create_http(api_key, prompt, max_output_tokens, text_format))
+        client = _get_client(api_key)
+        if stream_until is not None:
+            return _stream_text(client, prompt, max_output_tokens, stream_until)
+        extra: Dict[str, Any] = {"text": text_format} if text_format else {}
+        response = client.responses.create(
+            model=MODEL,
+            input=prompt,
+            max_output_tokens=max_output_tokens,
+            **extra,
+        )
+        return _first_text(response)
+
+    key_material = f"{MODEL}|{prompt}"
+    if text_format:
+        key_material += "|" + json.dumps(text_format, sort_keys=True)
+    if stream_until is not None:
+        # An early-stopped stream caches partial text; keep it apart from full completions.
+        key_material += f"|until:{stream_until.__module__}.{stream_until.__qualname__}"
+    return cached_call(key_material, request)
+
+
+def _stream_text(client: Any, prompt: str, max_output_tokens: int, stop: Callable[[str], Any]) -> Optional[str]:
+    """Accumulate streamed text deltas, closing the stream once ``stop`` accepts the partial text."""
+
+    buffer = ""
+    with client.responses.stream(model=MODEL, input=prompt, max_output_tokens=max_output_tokens) as stream:
+        for event in stream:
+            if getattr(event, "type", None) != "response.output_text.delta":
+                continue
+            buffer += getattr(event, "delta", "") or ""
+            if stop(buffer):
+                return buffer
+        final_text = _first_text(stream.get_final_response())
+    return final_text or buffer or None
+
+
+def _with_retries(fn: Callable[[], R]) -> R:
+    """Call ``fn``, retrying rate-limit and connection failures with jittered exponential backoff."""
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt == MAX_ATTEMPTS or not _is_transient(exc):
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)) + random.uniform(0, RETRY_BASE_DELAY)
+            LOGGER.debug("Transient OpenAI error (%s); retrying in %.1fs", exc, delay)
+            time.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover - loop always returns or raises
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Whether a failed request is worth retrying (rate limits, timeouts, dropped connections)."""
+
+    if _TRANSIENT_OPENAI_ERRORS and isinstance(exc, _TRANSIENT_OPENAI_ERRORS):
+        return True
+    if requests is None:
+        return False
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
 def _first_text(response: Any) -> Optional[str]:  # type: ignore[name-defined]
     """Extract the first textual output from an OpenAI response."""
 
@@ -126,36 +508,14 @@ def _normalise_category(raw: str) -> Optional[str]:
     if not text:
         return None
 
-    for choice in CATEGORY_CHOICES:
-        if text == choice:
-            return choice
-
-    # Handle common synonyms or phrases
-    synonyms = {
-        "bug": "fix",
-        "bugfix": "fix",
-        "bug fix": "fix",
-        "hotfix": "fix",
-        "fixes": "fix",
-        "feature addition": "feature",
-        "new feature": "feature",
-        "enhancement": "change",
-        "improvement": "change",
-        "maintenance": "change",
-        "refactor": "change",
-        "refactoring": "change",
-        "chore": "change",
-        "docs": "change",
-    }
-
-    # Exact match on synonyms
-    if text in synonyms:
-        return synonyms[text]
+    hit = _CATEGORY_LOOKUP.get(text)
+    if hit:
+        return hit
 
-    # Search for keywords within larger responses
-    for keyword, mapped in synonyms.items():
-        if keyword in text:
-            return mapped
+    # Search for keywords within larger responses in a single pass
+    match = _SYNONYM_PATTERN.search(text)
+    if match:
+        return CATEGORY_SYNONYMS[match.group(0)]
 
     for choice in CATEGORY_CHOICES:
         if choice in text:
@@ -164,4 +524,11 @@ def _normalise_category(raw: str) -> Optional[str]:
     return None
 
 
-__all__ = ["enhance_description", "suggest_category"]
+__all__ = [
+    "enhance_description",
+    "enrich_and_classify",
+    "enrich_and_classify_batch",
+    "enrich_and_classify_many",
+    "suggest_categories_many",
+    "suggest_category",
+]
@@ -4,11 +4,13 @@ from __future__ import annotations
 import argparse
 import logging
 import sys
+from functools import lru_cache
 
 from . import __version__
 from .updater import run_update
 
 
+@lru_cache(maxsize=1)
 def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="smart-changelog",
@@ -20,6 +22,11 @@ def _build_parser() -> argparse.ArgumentParser:
     update_parser.add_argument("--dry-run", action="store_true", help="Preview the changelog changes without writing to disk")
     update_parser.add_argument("--verbose", action="store_true", help="Enable verbose logging output")
     update_parser.add_argument("--ai", action="store_true", help="Use OpenAI to enrich changelog entries when possible")
+    update_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="With --ai, enrich commit history through the OpenAI Batch API (cheaper, but waits for the job)",
+    )
     update_parser.add_argument("--ticket", help="Override ticket detection and force a specific ticket identifier")
 
     parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
@@ -40,6 +47,7 @@ def main(argv: list[str] | None = None) -> int:
             use_ai=args.ai,
             forced_ticket=args.ticket,
             verbose=args.verbose,
+            batch=args.batch,
         )
         return 0
 
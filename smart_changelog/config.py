@@ -0,0 +1,35 @@
+"""Process-wide settings read from the environment once per run."""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Config:
+    """Credentials and switches consulted for every ticket."""
+
+    openai_api_key: Optional[str] = None
+    fast_http: bool = False
+    jira_url: Optional[str] = None
+    jira_token: Optional[str] = None
+    jira_email: Optional[str] = None
+    jira_api_token: Optional[str] = None
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Snapshot the relevant environment variables; call ``get_config.cache_clear()`` to re-read."""
+    return Config(
+        openai_api_key=os.getenv("OPENAI_API_KEY") or None,
+        fast_http=os.getenv("SMART_CHANGELOG_FAST_HTTP") == "1",
+        jira_url=os.getenv("JIRA_URL") or None,
+        jira_token=os.getenv("JIRA_TOKEN") or None,
+        jira_email=os.getenv("JIRA_EMAIL") or None,
+        jira_api_token=os.getenv("JIRA_API_TOKEN") or None,
+    )
+
+
+__all__ = ["Config", "get_config"]
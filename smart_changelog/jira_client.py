@@ -2,29 +2,53 @@
 from __future__ import annotations
 
 import base64
+import hashlib
 import logging
-import os
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 except ImportError:  # pragma: no cover - optional dependency path
     requests = None  # type: ignore[assignment]
+    HTTPAdapter = None  # type: ignore[assignment]
+    Retry = None  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency path
+    orjson = None  # type: ignore[assignment]
+
+from .config import get_config
 
 LOGGER = logging.getLogger(__name__)
 
+# Only these fields are read; asking for them alone keeps issue payloads small.
+TICKET_FIELDS = "summary,status,labels"
+
+_Credentials = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# Credentials by their sha256 ``auth_key``; the ticket cache is keyed by the digest, never the secrets.
+_CREDENTIALS: Dict[str, _Credentials] = {}
 
-@dataclass
+
+@dataclass(frozen=True)
 class JiraTicket:
     """Represents the distilled metadata needed for a changelog entry."""
 
     title: str
     status: str | None = None
-    labels: List[str] | None = None
+    labels: Tuple[str, ...] = ()
 
     def as_dict(self) -> Dict[str, Any]:
-        return {"title": self.title, "status": self.status, "labels": self.labels or []}
+        return {"title": self.title, "status": self.status, "labels": list(self.labels)}
+
+
+class _TicketUnavailable(Exception):
+    """Raised by ``_fetch_ticket`` so failed lookups are reported but never memoised."""
 
 
 def get_ticket_summary(
@@ -32,63 +56,130 @@ def get_ticket_summary(
     *,
     jira_url: str | None = None,
     token: str | None = None,
-) -> Dict[str, Any]:
+) -> JiraTicket:
     """Retrieve the Jira ticket summary information.
 
     Supports either a bearer token (``JIRA_TOKEN``) or the email/token pair (``JIRA_EMAIL`` +
     ``JIRA_API_TOKEN``) commonly used with Atlassian Cloud.
     """
 
-    jira_url = jira_url or os.getenv("JIRA_URL")
-    bearer_token = token or os.getenv("JIRA_TOKEN")
-    email = os.getenv("JIRA_EMAIL")
-    api_token = os.getenv("JIRA_API_TOKEN")
+    settings = _connection_settings(jira_url, token)
+    if settings is None:
+        return JiraTicket(title=ticket_id)
+    base_url, credentials = settings
+    auth_key = _auth_key(credentials)
+    _CREDENTIALS[auth_key] = credentials
 
-    if not jira_url:
-        LOGGER.debug("JIRA_URL not provided; falling back to raw ticket id")
-        return JiraTicket(title=ticket_id).as_dict()
+    try:
+        return _fetch_ticket(ticket_id, base_url, auth_key)
+    except _TicketUnavailable:
+        return JiraTicket(title=ticket_id)
 
-    if requests is None:
-        LOGGER.warning("requests library not available; returning basic ticket info")
-        return JiraTicket(title=ticket_id).as_dict()
 
-    headers = _build_auth_headers(bearer_token, email, api_token)
-    if headers is None:
-        LOGGER.debug("Jira credentials missing; using ticket id as title")
-        return JiraTicket(title=ticket_id).as_dict()
+@lru_cache(maxsize=512)
+def _fetch_ticket(ticket_id: str, base_url: str, auth_key: str) -> JiraTicket:
+    """Fetch one issue, memoised per ticket and credentials for the lifetime of the process."""
 
-    url = f"{jira_url.rstrip('/')}/rest/api/3/issue/{ticket_id}"
+    headers = _build_auth_headers(*_CREDENTIALS[auth_key])
+    url = f"{base_url}/rest/api/3/issue/{ticket_id}"
     LOGGER.debug("Requesting Jira issue %s from %s", ticket_id, url)
 
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        response = _get_session().get(
+            url,
+            headers=headers,
+            params={"fields": TICKET_FIELDS},
+            timeout=15,
+        )
         response.raise_for_status()
     except requests.HTTPError as exc:  # type: ignore[redundant-except]
         not_found = exc.response is not None and exc.response.status_code == 404
         message = "Jira ticket %s not found (404)" if not_found else "Failed to fetch Jira ticket %s: %s"
         args: tuple[Any, ...] = (ticket_id,) if not_found else (ticket_id, exc)
         LOGGER.warning(message, *args)
-        return JiraTicket(title=ticket_id).as_dict()
+        raise _TicketUnavailable(ticket_id) from exc
     except requests.RequestException as exc:
         LOGGER.warning("Network error while fetching Jira ticket %s: %s", ticket_id, exc)
-        return JiraTicket(title=ticket_id).as_dict()
+        raise _TicketUnavailable(ticket_id) from exc
 
     try:
-        data = response.json()
-    except ValueError:
+        data = _decode_json(response)
+    except ValueError as exc:
         LOGGER.warning("Invalid JSON while decoding Jira ticket %s", ticket_id)
-        return JiraTicket(title=ticket_id).as_dict()
+        raise _TicketUnavailable(ticket_id) from exc
+
+    return _ticket_from_fields(data.get("fields"), ticket_id)
+
+
+def _connection_settings(jira_url: str | None, token: str | None) -> Optional[Tuple[str, _Credentials]]:
+    """Resolve the Jira base URL and credentials, or ``None`` when lookups are not possible."""
+
+    config = get_config()
+    jira_url = jira_url or config.jira_url
+    bearer_token = token or config.jira_token
+    email = config.jira_email
+    api_token = config.jira_api_token
+
+    if not jira_url:
+        LOGGER.debug("JIRA_URL not provided; falling back to raw ticket id")
+        return None
+
+    if requests is None:
+        LOGGER.warning("requests library not available; returning basic ticket info")
+        return None
+
+    if _authorization_value(bearer_token, email, api_token) is None:
+        LOGGER.debug("Jira credentials missing; using ticket id as title")
+        return None
+
+    return jira_url.rstrip("/"), (bearer_token, email, api_token)
+
+
+def _auth_key(credentials: _Credentials) -> str:
+    """Digest ``credentials`` into a cache key that does not reveal them."""
+    material = "\x00".join(value or "" for value in credentials)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _ticket_from_fields(raw_fields: Any, ticket_id: str) -> JiraTicket:
+    """Distil the Jira ``fields`` payload into a ``JiraTicket``."""
 
-    fields: Dict[str, Any] = data.get("fields", {}) or {}
+    fields: Dict[str, Any] = raw_fields if isinstance(raw_fields, dict) else {}
     summary = fields.get("summary") or ticket_id
     status = None
     if isinstance(fields.get("status"), dict):
         status = fields["status"].get("name")
-    labels: List[str] = []
+    labels: Tuple[str, ...] = ()
     if isinstance(fields.get("labels"), list):
-        labels = [label for label in fields["labels"] if isinstance(label, str)]
+        labels = tuple(label for label in fields["labels"] if isinstance(label, str))
 
-    return JiraTicket(title=summary, status=status, labels=labels).as_dict()
+    return JiraTicket(title=summary, status=status, labels=labels)
+
+
+@lru_cache(maxsize=1)
+def _get_session() -> Any:
+    """Return a shared keep-alive session so consecutive ticket lookups reuse one connection."""
+    session = requests.Session()
+    if HTTPAdapter is not None and Retry is not None:
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+def _decode_json(response: Any) -> Any:
+    """Decode a response body, using orjson on the raw bytes when it is installed."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
 
 
 def _build_auth_headers(
@@ -98,23 +189,37 @@ def _build_auth_headers(
 ) -> Optional[Dict[str, str]]:
     """Construct authorization headers for Jira requests."""
 
+    authorization = _authorization_value(bearer_token, email, api_token)
+    if authorization is None:
+        return None
+    return {
+        "Authorization": authorization,
+        "Accept": "application/json",
+    }
+
+
+@lru_cache(maxsize=4)
+def _authorization_value(
+    bearer_token: Optional[str],
+    email: Optional[str],
+    api_token: Optional[str],
+) -> Optional[str]:
+    """Encode the ``Authorization`` header once per credential set."""
+
     if email and api_token:
         token_bytes = f"{email}:{api_token}".encode("utf-8")
         encoded = base64.b64encode(token_bytes).decode("ascii")
         LOGGER.debug("Using Jira basic authentication via email/API token")
-        return {
-            "Authorization": f"Basic {encoded}",
-            "Accept": "application/json",
-        }
+        return f"Basic {encoded}"
 
     if bearer_token:
         LOGGER.debug("Using Jira bearer token authentication")
-        return {
-            "Authorization": f"Bearer {bearer_token}",
-            "Accept": "application/json",
-        }
+        return f"Bearer {bearer_token}"
 
     return None
 
 
-__all__ = ["get_ticket_summary", "JiraTicket"]
+__all__ = [
+    "get_ticket_summary",
+    "JiraTicket",
+]
@@ -0,0 +1,79 @@
+"""Persistent SQLite cache for OpenAI responses used by Smart Changelog."""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Callable, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_FILENAME = "llm.sqlite"
+
+
+def cache_path() -> Path:
+    """Location of the cache database, honouring ``XDG_CACHE_HOME``."""
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "smart-changelog" / CACHE_FILENAME
+
+
+def cached_call(key_material: str, fn: Callable[[], Optional[str]]) -> Optional[str]:
+    """Return the cached value for ``key_material`` or compute it with ``fn``.
+
+    Only non-empty results are stored so transient failures are retried on the next run. Setting
+    ``SMART_CHANGELOG_NO_CACHE=1`` bypasses the cache entirely.
+    """
+
+    if os.getenv("SMART_CHANGELOG_NO_CACHE") == "1":
+        return fn()
+
+    key = hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+    path = cache_path()
+
+    cached = _lookup(path, key)
+    if cached is not None:
+        LOGGER.debug("LLM cache hit for %s", key[:12])
+        return cached
+
+    value = fn()
+    if value:
+        _store(path, key, value)
+    return value
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(str(path), timeout=5)
+    connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, ts INTEGER)")
+    return connection
+
+
+def _lookup(path: Path, key: str) -> Optional[str]:
+    if not path.exists():
+        return None
+
+    try:
+        with closing(_connect(path)) as connection:
+            row = connection.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+    except (OSError, sqlite3.Error) as exc:
+        LOGGER.debug("LLM cache lookup failed: %s", exc)
+        return None
+    return row[0] if row else None
+
+
+def _store(path: Path, key: str, value: str) -> None:
+    try:
+        with closing(_connect(path)) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+                (key, value, int(time.time())),
+            )
+    except (OSError, sqlite3.Error) as exc:
+        LOGGER.debug("LLM cache write failed: %s", exc)
+
+
+__all__ = ["cache_path", "cached_call"]
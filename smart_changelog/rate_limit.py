@@ -0,0 +1,99 @@
+"""Client-side request/token rate limiting for OpenAI calls."""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe leaky bucket tracking request and token capacity per minute.
+
+    A limit of ``0`` disables that dimension. Capacity refills continuously, so callers block only
+    for as long as it takes to accumulate what the next request needs.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.requests_per_minute = max(0.0, float(requests_per_minute))
+        self.tokens_per_minute = max(0.0, float(tokens_per_minute))
+        self._clock = clock
+        self._sleep = sleep
+        self._request_capacity = self.requests_per_minute
+        self._token_capacity = self.tokens_per_minute
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request costing ``tokens`` fits within both limits, then consume it."""
+
+        # A single request larger than the whole budget can only ever wait for a full bucket.
+        tokens_needed = min(float(tokens), self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                request_short = 1 - self._request_capacity if self.requests_per_minute else 0.0
+                token_short = tokens_needed - self._token_capacity if self.tokens_per_minute else 0.0
+                if request_short <= 0 and token_short <= 0:
+                    if self.requests_per_minute:
+                        self._request_capacity -= 1
+                    if self.tokens_per_minute:
+                        self._token_capacity -= tokens_needed
+                    return
+
+                wait = max(
+                    request_short * 60.0 / self.requests_per_minute if request_short > 0 else 0.0,
+                    token_short * 60.0 / self.tokens_per_minute if token_short > 0 else 0.0,
+                )
+
+            LOGGER.debug("Rate limit reached; waiting %.2fs before next OpenAI request", wait)
+            self._sleep(wait)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        if self.requests_per_minute:
+            self._request_capacity = min(
+                self.requests_per_minute,
+                self._request_capacity + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._token_capacity = min(
+                self.tokens_per_minute,
+                self._token_capacity + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+
+def limiter_from_env() -> Optional[RateLimiter]:
+    """Build a limiter from ``SMART_CHANGELOG_RPM`` / ``SMART_CHANGELOG_TPM``; ``None`` when unset."""
+
+    rpm = _read_limit("SMART_CHANGELOG_RPM")
+    tpm = _read_limit("SMART_CHANGELOG_TPM")
+    if not rpm and not tpm:
+        return None
+    return RateLimiter(rpm, tpm)
+
+
+def _read_limit(name: str) -> float:
+    raw = os.getenv(name)
+    if not raw:
+        return 0.0
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        LOGGER.warning("Ignoring invalid %s value '%s'", name, raw)
+        return 0.0
+
+
+__all__ = ["RateLimiter", "limiter_from_env"]
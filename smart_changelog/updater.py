@@ -1,15 +1,20 @@
 """Core changelog update logic."""
 from __future__ import annotations
 
+import contextlib
+import io
 import logging
 import os
 import re
+import shutil
+import string
 import subprocess
+import time
 from dataclasses import dataclass
-from datetime import datetime
+from functools import lru_cache
 from importlib import resources
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 try:
     import yaml
@@ -21,18 +26,52 @@ try:
 except ImportError:  # pragma: no cover - optional dependency fallback
     Template = None  # type: ignore[assignment]
 
-from .ai_helper import enhance_description, suggest_category
+from .ai_helper import (
+    enrich_and_classify,
+    enrich_and_classify_batch,
+    enrich_and_classify_many,
+    suggest_categories_many,
+    suggest_category,
+)
 from .jira_client import get_ticket_summary
 
 LOGGER = logging.getLogger(__name__)
 
+# libyaml's C loader parses several times faster than the pure-Python SafeLoader when compiled in.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", None) or getattr(yaml, "SafeLoader", None)
+
 TICKET_PATTERN = re.compile(r"([A-Z][A-Z0-9]+-\d+)")
+_LAST_UPDATED_RE = re.compile(r"(_Last updated:\s*)(\d{4}-\d{2}-\d{2})(_)")
+# Ticket ids live in titles, branch names or the first lines of a message; scan no further.
+TICKET_SCAN_LIMIT = 4096
+# Characters that can continue a ticket id; a scan window never ends inside a run of them.
+_TICKET_ID_CHARS = string.ascii_letters + string.digits + "-"
+UNRELEASED_HEADING = "## [Unreleased]"
+# (category, leading keyword, "keyword:" marker) checked in order against the lower-cased title.
+_TITLE_CATEGORY_KEYWORDS = (("feature", "feat", "feat:"), ("fix", "fix", "fix:"))
+# Anchored alternatives tried in order, so a "bug" label outranks "feature" wherever each appears.
+_LABEL_CATEGORY_RE = re.compile(
+    r"(?P<fix>.*bug|fix)|(?P<feature>.*feature|feat)"
+    r"|(?P<change>.*(?:chore|maintenance|refactor|doc|change|improv|enhanc))",
+    re.IGNORECASE | re.DOTALL,
+)
+# The indented lines (blank and comment lines allowed) below a top-level ``version:`` key.
+_MANIFEST_VERSION_RE = re.compile(r"^version:[ \t]*\n((?:(?:[ \t]+\S.*|[ \t]*(?:#.*)?)(?:\n|\Z))*)", re.MULTILINE)
+_MANIFEST_FIELD_RE = re.compile(r"^[ \t]+(\w+):[ \t]*(.*?)[ \t]*$", re.MULTILINE)
+# One ``%H%x09%s%x09%an%x09%cs`` record per line; lines with stray tabs are skipped.
+_LOG_LINE_RE = re.compile(r"^([^\t\n]*)\t([^\t\n]*)\t([^\t\n]*)\t([^\t\n]*)$", re.MULTILINE)
+CHANGE_ID_PREFIX = "CHANGE-"
+_CHANGE_ID_CHARS = frozenset(string.ascii_letters + string.digits)
 SECTION_HEADINGS = {
     "feature": "### 🧩 New Features",
     "fix": "### 🐛 Bug Fixes",
     "change": "### ⚙️ Changes",
 }
 
+# The trailing "(TICKET, author, date)" group that ``UpdateContext.render_entry`` emits.
+_ENTRY_TICKET_RE = re.compile(r"\(([A-Z][A-Z0-9]+-\w+),[^()]*\)\s*$")
+_HEADING_TO_KEY = {heading: key for key, heading in SECTION_HEADINGS.items()}
+
 SECTION_MARKERS = {
     key: {
         "start": f"<!-- section:{key} -->",
@@ -41,9 +80,13 @@ SECTION_MARKERS = {
     for key in SECTION_HEADINGS
 }
 
+# One pass over a block yields every marked section as (key, segment).
+_SECTION_SEGMENT_RE = re.compile(r"<!-- section:(\w+) -->(.*?)<!-- /section:\1 -->", re.DOTALL)
+
 
+@lru_cache(maxsize=4)
 def _read_template_text(filename: str) -> str:
-    """Read a template asset, tolerating namespace package execution."""
+    """Read a packaged template asset once, tolerating namespace package execution."""
     try:
         return resources.files("smart_changelog.templates").joinpath(filename).read_text(encoding="utf-8")
     except Exception:
@@ -51,24 +94,44 @@ def _read_template_text(filename: str) -> str:
         return fallback_path.read_text(encoding="utf-8")
 
 
-def _section_definitions() -> List[Dict[str, Any]]:
-    """Builds metadata for each changelog section in render order."""
-    definitions: List[Dict[str, Any]] = []
-    for key, heading in SECTION_HEADINGS.items():
-        definitions.append(
-            {
-                "key": key,
-                "heading": heading.replace("### ", "").strip(),
-                "start_marker": SECTION_MARKERS[key]["start"],
-                "end_marker": SECTION_MARKERS[key]["end"],
-            }
-        )
-    return definitions
+@dataclass(frozen=True)
+class _SectionDefinition:
+    """One changelog section as exposed to the version-block template."""
+
+    key: str
+    heading: str
+    start_marker: str
+    end_marker: str
+    entries: Tuple[str, ...] = ()
+
+    def with_entries(self, entries: Sequence[str]) -> _SectionDefinition:
+        return _SectionDefinition(self.key, self.heading, self.start_marker, self.end_marker, tuple(entries))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The mapping templates receive, so ``section["entries"]`` and ``section.get(...)`` keep working."""
+        return {
+            "key": self.key,
+            "heading": self.heading,
+            "start_marker": self.start_marker,
+            "end_marker": self.end_marker,
+            "entries": list(self.entries),
+        }
+
+
+# Built once in render order; renders only attach entries to sections that have any.
+_SECTION_DEFINITIONS: Tuple[_SectionDefinition, ...] = tuple(
+    _SectionDefinition(
+        key=key,
+        heading=heading.replace("### ", "").strip(),
+        start_marker=SECTION_MARKERS[key]["start"],
+        end_marker=SECTION_MARKERS[key]["end"],
+    )
+    for key, heading in SECTION_HEADINGS.items()
+)
 
 
-def _load_version_template_text() -> str:
-    """Loads the version block template, respecting SMART_CHANGELOG_TEMPLATE."""
-    custom_template = os.getenv("SMART_CHANGELOG_TEMPLATE")
+def _load_version_template_text(custom_template: Optional[str]) -> str:
+    """Loads the version block template, preferring the SMART_CHANGELOG_TEMPLATE file when set."""
     if custom_template:
         try:
             return Path(custom_template).read_text(encoding="utf-8")
@@ -78,6 +141,21 @@ def _load_version_template_text() -> str:
     return _read_template_text("version_block.md.j2")
 
 
+def _version_template(custom_template: str) -> Any:
+    """Return the compiled template for ``custom_template``, recompiling when the file changes."""
+    try:
+        mtime_ns: Optional[int] = os.stat(custom_template).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return _compile_version_template(custom_template, mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _compile_version_template(custom_template: Optional[str], mtime_ns: Optional[int]) -> Any:
+    """Compile once per template source; an edited custom template changes ``mtime_ns``."""
+    return Template(_load_version_template_text(custom_template))
+
+
 def _normalise_block(block: str) -> str:
     """Normalise leading/trailing whitespace to ease comparisons and replacements."""
     trimmed = block.strip("\n")
@@ -91,38 +169,57 @@ def _render_version_block(
 ) -> str:
     """Render a version block using the configured template."""
     entries = entries_by_section or {}
-    sections: List[Dict[str, Any]] = []
-    for definition in _section_definitions():
-        sections.append(
-            {
-                **definition,
-                "entries": entries.get(definition["key"], []),
-            }
-        )
+    sections = [
+        definition.with_entries(entries[definition.key]) if entries.get(definition.key) else definition
+        for definition in _SECTION_DEFINITIONS
+    ]
 
-    template_text = _load_version_template_text()
-    if Template is not None:
-        rendered = Template(template_text).render(version=version, date=date_str, sections=sections)
-    else:  # pragma: no cover - fallback when jinja2 missing
+    custom_template = os.getenv("SMART_CHANGELOG_TEMPLATE") or None
+    if Template is None:  # pragma: no cover - fallback when jinja2 missing
         rendered = _render_version_block_fallback(version, date_str, sections)
+    elif custom_template is None:
+        rendered = _render_default_version_block(version, date_str, sections)
+    else:
+        context = [section.as_dict() for section in sections]
+        rendered = _version_template(custom_template).render(version=version, date=date_str, sections=context)
 
     return _normalise_block(rendered)
 
 
-def _render_version_block_fallback(version: str, date_str: str, sections: List[Dict[str, Any]]) -> str:
-    lines: List[str] = [f"## {version}", f"_Last updated: {date_str}_", ""]
+def _render_default_version_block(version: str, date_str: str, sections: Sequence[_SectionDefinition]) -> str:
+    """Produce exactly what jinja2 renders from the packaged ``version_block.md.j2``.
+
+    Stands in for the packaged template so the common case skips jinja2 entirely. Keep this in step
+    with the template; ``test_packaged_version_template_is_pinned`` fails when the template changes.
+    """
+    buffer = io.StringIO()
+    buffer.write(f"## {version}\n_Last updated: {date_str}_\n\n")
     for section in sections:
-        lines.append(section["start_marker"])
-        entries = section.get("entries") or []
-        if entries:
-            lines.append(f"### {section['heading']}")
-            lines.append("")
-            lines.extend(entries)
-            lines.append("")
-        lines.append(section["end_marker"])
-        lines.append("")
+        buffer.write(f"\n{section.start_marker}\n")
+        if section.entries:
+            buffer.write(f"### {section.heading}\n\n")
+            for entry in section.entries:
+                buffer.write(f"\n{entry}\n")
+            buffer.write("\n\n")
+        buffer.write(f"\n{section.end_marker}\n\n")
+
+    return buffer.getvalue()
 
-    return "\n".join(lines)
+
+def _render_version_block_fallback(version: str, date_str: str, sections: Sequence[_SectionDefinition]) -> str:
+    buffer = io.StringIO()
+    buffer.write(f"## {version}\n_Last updated: {date_str}_\n")
+    for section in sections:
+        buffer.write(f"\n{section.start_marker}\n")
+        if section.entries:
+            buffer.write(f"### {section.heading}\n\n")
+            for entry in section.entries:
+                buffer.write(entry)
+                buffer.write("\n")
+            buffer.write("\n")
+        buffer.write(f"{section.end_marker}\n")
+
+    return buffer.getvalue()
 
 
 def _parse_version_block(block: str) -> Dict[str, Any]:
@@ -132,25 +229,20 @@ def _parse_version_block(block: str) -> Dict[str, Any]:
     if lines and lines[0].startswith("## "):
         version = lines[0][3:].strip()
 
-    date_match = re.search(r"_Last updated:\s*(\d{4}-\d{2}-\d{2})_", block)
-    date = date_match.group(1) if date_match else ""
+    date_match = _LAST_UPDATED_RE.search(block)
+    date = date_match.group(2) if date_match else ""
+
+    segments: Dict[str, str] = {}
+    for match in _SECTION_SEGMENT_RE.finditer(block):
+        segments.setdefault(match.group(1), match.group(2))
 
     sections: Dict[str, List[str]] = {}
-    for definition in _section_definitions():
-        key = definition["key"]
-        start_marker = definition["start_marker"]
-        end_marker = definition["end_marker"]
-        start_idx = block.find(start_marker)
-        end_idx = block.find(end_marker)
-
-        entries: List[str] = []
-        if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-            segment = block[start_idx + len(start_marker) : end_idx]
-            entries = _extract_entries_from_segment(segment)
+    for key, heading in SECTION_HEADINGS.items():
+        segment = segments.get(key)
+        if segment is not None:
+            sections[key] = _extract_entries_from_segment(segment)
         else:
-            entries = _extract_entries_from_heading(block, SECTION_HEADINGS[key])
-
-        sections[key] = entries
+            sections[key] = _extract_entries_from_heading(block, heading)
 
     return {"version": version, "date": date, "sections": sections}
 
@@ -164,42 +256,42 @@ def _extract_entries_from_segment(segment: str) -> List[str]:
 
 def _extract_entries_from_heading(block: str, heading: str) -> List[str]:
     """Fallback parser for legacy headings without template markers."""
-    pattern = re.compile(rf"{re.escape(heading)}\n(.*?)(?=\n### |\n## |\Z)", re.DOTALL)
-    match = pattern.search(block)
-    if not match:
+    marker = f"{heading}\n"
+    start = block.find(marker)
+    if start == -1:
         return []
-    lines = match.group(1).splitlines()
+    start += len(marker)
+    end = min(
+        (idx for idx in (block.find("\n### ", start), block.find("\n## ", start)) if idx != -1),
+        default=len(block),
+    )
+    lines = block[start:end].splitlines()
     cleaned = _strip_non_entry_lines(lines)
     return cleaned
 
 
 def _strip_non_entry_lines(lines: List[str]) -> List[str]:
-    """Trim blank lines and remove heading remnants from a section."""
-    trimmed = list(lines)
-    while trimmed and not trimmed[0].strip():
-        trimmed.pop(0)
-    if trimmed and trimmed[0].lstrip().startswith("###"):
-        trimmed.pop(0)
-    while trimmed and not trimmed[0].strip():
-        trimmed.pop(0)
-    while trimmed and not trimmed[-1].strip():
-        trimmed.pop()
-    return [line.rstrip() for line in trimmed if line.strip()]
+    """Drop blank lines and a leading ``###`` heading from a section."""
+    entries = [line.rstrip() for line in lines if line.strip()]
+    if entries and entries[0].lstrip().startswith("###"):
+        del entries[0]
+    return entries
 
 
 def _replace_version_block(content: str, version_heading: str, new_block: str) -> Tuple[str, bool]:
     """Replace an existing version block with freshly rendered content."""
-    match = _find_version_block(content, version_heading)
-    if not match:
+    span = _find_version_block(content, version_heading)
+    if span is None:
         LOGGER.warning("Version block '%s' not found", version_heading)
         return content, False
 
-    existing = _normalise_block(match.group(1))
+    start, end = span
+    existing = _normalise_block(content[start:end])
     replacement = _normalise_block(new_block)
     if existing == replacement:
         return content, False
 
-    updated = content[: match.start(1)] + replacement + content[match.end(1):]
+    updated = content[:start] + replacement + content[end:]
     return updated, True
 
 
@@ -214,56 +306,113 @@ class UpdateContext:
     date: str
 
     def render_entry(self) -> str:
-        if Template is not None:
-            template = Template("- {{ title }} ({{ ticket }}, {{ author }}, {{ date }})")
-            return template.render(
-                title=self.title.strip(),
-                ticket=self.ticket_id,
-                author=self.author.strip() or "Unknown",
-                date=self.date,
-            )
-        # Fallback avoids jinja2 dependency when unavailable.
+        # The entry format is fixed, so a plain f-string renders it without going through jinja2.
         author = self.author.strip() or "Unknown"
         return f"- {self.title.strip()} ({self.ticket_id}, {author}, {self.date})"
 
 
-def run_update(*, dry_run: bool, use_ai: bool, forced_ticket: Optional[str], verbose: bool) -> None:
-    """Public entrypoint used by the CLI."""
+CONTEXT_ENV_VARS = (
+    "CI_COMMIT_TITLE",
+    "CI_MERGE_REQUEST_TITLE",
+    "CI_COMMIT_MESSAGE",
+    "CI_COMMIT_BRANCH",
+    "GITHUB_HEAD_REF",
+    "GITHUB_REF_NAME",
+    "GITHUB_REF",
+    "BRANCH_NAME",
+)
+AUTHOR_ENV_VARS = ("CI_COMMIT_AUTHOR", "GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME")
+BRANCH_ENV_VARS = ("GITHUB_REF_NAME", "GITHUB_HEAD_REF", "CI_COMMIT_BRANCH", "CI_DEFAULT_BRANCH")
+
+
+@dataclass(frozen=True)
+class CiEnv:
+    """Non-empty CI/git environment variables, read once per run and shared by the helpers."""
+
+    values: Dict[str, str]
+
+    @classmethod
+    def from_environ(cls) -> CiEnv:
+        names = dict.fromkeys(CONTEXT_ENV_VARS + AUTHOR_ENV_VARS + BRANCH_ENV_VARS)
+        values = {}
+        for name in names:
+            value = os.environ.get(name)
+            if value:
+                values[name] = value
+        return cls(values)
+
+    def first(self, names: Sequence[str]) -> Optional[str]:
+        return next((self.values[name] for name in names if name in self.values), None)
+
+    def all(self, names: Sequence[str]) -> List[str]:
+        return [self.values[name] for name in names if name in self.values]
+
+
+def run_update(
+    *,
+    dry_run: bool,
+    use_ai: bool,
+    forced_ticket: Optional[str],
+    verbose: bool,
+    batch: bool = False,
+    base_path: Optional[Path] = None,
+) -> None:
+    """Public entrypoint used by the CLI.
+
+    ``CHANGELOG.md`` and ``manifest.yaml`` are looked up in ``base_path``, the working directory by default.
+    """
 
     if verbose:
         LOGGER.debug("Verbose mode enabled")
 
-    changelog_path = Path("CHANGELOG.md")
-    changelog_text = _read_changelog(changelog_path)
+    base = base_path or Path()
+    changelog_path = base / "CHANGELOG.md"
+    original_text = changelog_text = _read_changelog(changelog_path, write_if_missing=not dry_run)
 
-    version = _current_version()
+    version = _current_version(base / "manifest.yaml")
     version_heading = f"## {version}"
-    date_str = datetime.utcnow().date().isoformat()
+    date_str = _today_utc()
 
-    changelog_text, version_created = _ensure_version_block(changelog_text, version_heading, date_str)
+    changelog_text, _ = _ensure_version_block(changelog_text, version_heading, date_str)
 
-    context_strings = _gather_context_strings()
-    existing_ids = _extract_existing_ids(changelog_text)
-    ticket_id = _detect_ticket_id(forced_ticket, context_strings)
+    head = _head_commit()
+    env = CiEnv.from_environ()
+    # A forced ticket decides the id on its own; CI variables and git metadata are only scanned otherwise.
+    context_strings: Optional[List[str]] = None
+    if forced_ticket:
+        ticket_id = _detect_ticket_id(forced_ticket, [])
+    else:
+        context_strings = _gather_context_strings(head, env)
+        ticket_id = _detect_ticket_id(None, context_strings)
 
-    commit_title = _git_output(["git", "log", "-1", "--pretty=%s"]) or ""
-    author = _detect_author()
+    commit_title = head.subject
+    author = _detect_author(head, env)
 
     contexts: List[UpdateContext] = []
 
     if ticket_id:
         LOGGER.info("Fetching Jira summary for %s", ticket_id)
-        jira_summary = get_ticket_summary(ticket_id)
-        title = jira_summary.get("title") or commit_title or ticket_id
+        jira_ticket = get_ticket_summary(ticket_id)
+        title = jira_ticket.title or commit_title or ticket_id
+        ai_category: Optional[str] = None
         if use_ai:
             LOGGER.info("Using OpenAI to enhance title for %s", ticket_id)
-            title = enhance_description(title, ticket_id)
+            title, ai_category = enrich_and_classify(
+                title,
+                ticket_id,
+                _category_context(
+                    commit_title,
+                    ticket_labels=list(jira_ticket.labels),
+                    ticket_status=jira_ticket.status,
+                ),
+            )
         category = _resolve_category(
             commit_title,
             use_ai=use_ai,
             ticket_title=title,
-            ticket_labels=jira_summary.get("labels"),
-            ticket_status=jira_summary.get("status"),
+            ticket_labels=list(jira_ticket.labels),
+            ticket_status=jira_ticket.status,
+            ai_category=ai_category,
         )
         contexts.append(
             UpdateContext(
@@ -276,19 +425,29 @@ def run_update(*, dry_run: bool, use_ai: bool, forced_ticket: Optional[str], ver
         )
     else:
         LOGGER.info("No Jira ticket detected; gathering commit history")
-        fallback_contexts = _contexts_from_commit_history(existing_ids, use_ai)
+        # Only the history scan needs the recorded ids, so the changelog is searched for them here.
+        existing_ids = _extract_existing_ids(changelog_text)
+        fallback_contexts = _contexts_from_commit_history(existing_ids, use_ai, batch=batch)
         if not fallback_contexts:
-            fallback_id = _fallback_ticket_identifier()
+            fallback_id = _fallback_ticket_identifier(head)
+            if context_strings is None:
+                context_strings = _gather_context_strings(head, env)
             fallback_title = commit_title or _first_non_empty(context_strings) or "Unspecified change"
+            fallback_ai_category: Optional[str] = None
             if use_ai:
                 LOGGER.info("Using OpenAI to enhance fallback title for %s", fallback_id)
-                fallback_title = enhance_description(fallback_title, fallback_id)
+                fallback_title, fallback_ai_category = enrich_and_classify(
+                    fallback_title,
+                    fallback_id,
+                    _category_context(commit_title),
+                )
             fallback_category = _resolve_category(
                 commit_title,
                 use_ai=use_ai,
                 ticket_title=fallback_title,
                 ticket_labels=None,
                 ticket_status=None,
+                ai_category=fallback_ai_category,
             )
             fallback_contexts = [
                 UpdateContext(
@@ -302,29 +461,11 @@ def run_update(*, dry_run: bool, use_ai: bool, forced_ticket: Optional[str], ver
             LOGGER.info("Proceeding without Jira ticket; using fallback identifier %s", fallback_contexts[0].ticket_id)
         contexts.extend(fallback_contexts)
 
-    changes_made = version_created
-    last_entry = ""
-    changelog_updated = changelog_text
-
-    for ctx in contexts:
-        heading = SECTION_HEADINGS.get(ctx.category, SECTION_HEADINGS["change"])
-        LOGGER.info("Updating changelog for %s (category: %s)", ctx.ticket_id, ctx.category)
-        entry = ctx.render_entry()
-        changelog_updated, entry_changed = _upsert_entry_for_version(
-            changelog_updated,
-            version_heading,
-            heading,
-            entry,
-            ctx.ticket_id,
-        )
-        existing_ids.add(ctx.ticket_id)
-        changes_made = changes_made or entry_changed
-        last_entry = entry
+    pending = _collect_entries(contexts)
+    changelog_updated, _ = _update_version_block(changelog_text, version_heading, pending, date_str)
 
-    changelog_updated, date_changed = _update_last_updated(changelog_updated, version_heading, date_str)
-    changes_made = changes_made or date_changed
-
-    if not changes_made:
+    # Compare with what was read rather than trusting per-step flags: a no-op never touches the disk or git.
+    if changelog_updated == original_text:
         LOGGER.info("Changelog already up to date")
         return
 
@@ -333,23 +474,71 @@ def run_update(*, dry_run: bool, use_ai: bool, forced_ticket: Optional[str], ver
         print(changelog_updated)
         return
 
-    changelog_path.write_text(changelog_updated, encoding="utf-8")
+    _write_changelog(changelog_path, changelog_updated)
     LOGGER.debug("CHANGELOG.md updated on disk")
 
-    if contexts:
-        _maybe_commit_and_push("CHANGELOG.md", last_entry)
+    if pending:
+        _maybe_commit_and_push(str(changelog_path), pending[-1][1], head=head, env=env, changed=True)
+
+
+def _collect_entries(contexts: Sequence[UpdateContext]) -> List[Tuple[str, str, str]]:
+    """Render each context into a ``(section_heading, entry, ticket_id)`` upsert, in order."""
+    pending: List[Tuple[str, str, str]] = []
+    for ctx in contexts:
+        heading = SECTION_HEADINGS.get(ctx.category, SECTION_HEADINGS["change"])
+        LOGGER.info("Updating changelog for %s (category: %s)", ctx.ticket_id, ctx.category)
+        pending.append((heading, ctx.render_entry(), ctx.ticket_id))
+    return pending
 
 
-def _read_changelog(path: Path) -> str:
-    if path.exists():
-        return path.read_text(encoding="utf-8")
+def _today_utc() -> str:
+    """Today's UTC date as ``YYYY-MM-DD``, without building a ``datetime``."""
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _read_changelog(path: Path, *, write_if_missing: bool = True) -> str:
+    """Return the changelog text, bootstrapping a missing file from the packaged template."""
+    try:
+        return _decode_changelog(path.read_bytes())
+    except FileNotFoundError:
+        pass
 
     LOGGER.info("CHANGELOG.md not found; bootstrapping from template")
     template_text = _read_template_text("changelog_template.md")
-    path.write_text(template_text, encoding="utf-8")
+    if write_if_missing:
+        _write_changelog(path, template_text)
     return template_text
 
 
+def _decode_changelog(data: bytes) -> str:
+    """Decode changelog bytes once, normalising newlines the way text-mode reads would."""
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _write_changelog(path: Path, text: str) -> None:
+    """Write through a sibling temp file and ``os.replace`` so readers never see a partial file.
+
+    A symlinked changelog is resolved first so the link survives and its target gets the update.
+    """
+    path = path.resolve()
+    tmp_name = str(path.with_name(f".{path.name}.{os.urandom(6).hex()}.tmp"))
+    # Created like ``write_text`` would: 0o666 filtered by the umask, without touching the umask.
+    fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(text.encode("utf-8"))
+        with contextlib.suppress(FileNotFoundError):
+            shutil.copymode(str(path), tmp_name)
+        os.replace(tmp_name, str(path))
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+
 def _detect_ticket_id(forced_ticket: Optional[str], candidates: list[str]) -> Optional[str]:
     if forced_ticket:
         match = TICKET_PATTERN.search(forced_ticket)
@@ -358,51 +547,44 @@ def _detect_ticket_id(forced_ticket: Optional[str], candidates: list[str]) -> Op
         LOGGER.warning("Forced ticket '%s' does not match expected pattern", forced_ticket)
         return None
 
-    for candidate in candidates:
-        match = TICKET_PATTERN.search(candidate)
-        if match:
-            return match.group(1)
+    # One scan over all candidates; the separator cannot occur inside a ticket id, so the leftmost
+    # match is the first candidate's match, exactly as searching them one by one.
+    combined = "\x1f".join(_scan_window(candidate) for candidate in candidates if candidate)
+    if "-" not in combined:
+        # Every ticket id contains a hyphen; ticket-free commit text never reaches the regex.
+        return None
+    match = TICKET_PATTERN.search(combined)
+    return match.group(1) if match else None
 
-    return None
 
+def _scan_window(candidate: str) -> str:
+    """Return at most ``TICKET_SCAN_LIMIT`` leading characters, dropping a token cut by the limit.
 
-def _gather_context_strings() -> list[str]:
-    candidates = []
-    env_vars = [
-        "CI_COMMIT_TITLE",
-        "CI_MERGE_REQUEST_TITLE",
-        "CI_COMMIT_MESSAGE",
-        "CI_COMMIT_BRANCH",
-        "GITHUB_HEAD_REF",
-        "GITHUB_REF_NAME",
-        "GITHUB_REF",
-        "BRANCH_NAME",
-    ]
-    for key in env_vars:
-        value = os.getenv(key)
-        if value:
-            candidates.append(value)
+    Otherwise ``ABC-123456`` straddling the limit would be read as ``ABC-1``.
+    """
+    window = candidate[:TICKET_SCAN_LIMIT]
+    if len(candidate) > TICKET_SCAN_LIMIT and candidate[TICKET_SCAN_LIMIT] in _TICKET_ID_CHARS:
+        window = window.rstrip(_TICKET_ID_CHARS)
+    return window
+
+
+def _gather_context_strings(head: Optional[HeadCommit] = None, env: Optional[CiEnv] = None) -> list[str]:
+    env = env if env is not None else CiEnv.from_environ()
+    candidates = env.all(CONTEXT_ENV_VARS)
 
-    commit_message = _git_output(["git", "log", "-1", "--pretty=%B"]) or ""
-    branch_name = _git_output(["git", "rev-parse", "--abbrev-ref", "HEAD"]) or ""
-    candidates.extend(filter(None, [commit_message, branch_name]))
+    head = head or _head_commit()
+    candidates.extend(filter(None, [head.message, head.branch]))
 
     return candidates
 
 
 def _categorize(commit_title: str) -> str:
-    title_lower = commit_title.lower()
-    # Inspect the first word when available, falling back to substring checks.
-    first_word = title_lower.split()[0] if title_lower else ""
-
-    if first_word.startswith("feat") or "feat:" in title_lower:
-        return "feature"
-    if first_word.startswith("fix") or "fix:" in title_lower:
-        return "fix"
-    if first_word.startswith("chore") or "chore:" in title_lower:
-        return "change"
-    if first_word.startswith("refactor") or "refactor:" in title_lower or "change" in title_lower:
-        return "change"
+    # A title opening with the keyword, or carrying a "keyword:" prefix anywhere; features win over fixes.
+    lowered = commit_title.lower()
+    leading = lowered.lstrip()
+    for category, keyword, marker in _TITLE_CATEGORY_KEYWORDS:
+        if leading.startswith(keyword) or marker in lowered:
+            return category
     return "change"
 
 
@@ -411,13 +593,9 @@ def _categorize_from_labels(labels: Optional[List[str]]) -> Optional[str]:
         return None
 
     for label in labels:
-        normalized = label.lower()
-        if "bug" in normalized or normalized.startswith("fix"):
-            return "fix"
-        if "feature" in normalized or normalized.startswith("feat"):
-            return "feature"
-        if any(token in normalized for token in ["chore", "maintenance", "refactor", "doc", "change", "improv", "enhanc"]):
-            return "change"
+        match = _LABEL_CATEGORY_RE.match(label)
+        if match:
+            return match.lastgroup
     return None
 
 
@@ -428,6 +606,7 @@ def _resolve_category(
     ticket_title: Optional[str] = None,
     ticket_labels: Optional[List[str]] = None,
     ticket_status: Optional[str] = None,
+    ai_category: Optional[str] = None,
 ) -> str:
     base_category = _categorize(commit_title)
 
@@ -438,6 +617,29 @@ def _resolve_category(
     if not use_ai:
         return base_category
 
+    # A category returned alongside the enriched title saves a dedicated classification request.
+    if ai_category is None:
+        context_blob = _category_context(
+            commit_title,
+            ticket_title=ticket_title,
+            ticket_labels=ticket_labels,
+            ticket_status=ticket_status,
+        )
+        ai_category = suggest_category(context_blob) if context_blob else None
+    if ai_category in SECTION_HEADINGS:
+        return ai_category
+
+    return base_category
+
+
+def _category_context(
+    commit_title: str,
+    *,
+    ticket_title: Optional[str] = None,
+    ticket_labels: Optional[List[str]] = None,
+    ticket_status: Optional[str] = None,
+) -> str:
+    """Assemble the free-form context handed to the AI classifier."""
     context_parts: List[str] = []
     if ticket_title:
         context_parts.append(f"Ticket title: {ticket_title}")
@@ -451,31 +653,35 @@ def _resolve_category(
     if not context_parts and commit_title:
         context_parts.append(commit_title)
 
-    context_blob = "\n".join(context_parts)
-    ai_category = suggest_category(context_blob) if context_blob else None
-    if ai_category in SECTION_HEADINGS:
-        return ai_category
-
-    return base_category
+    return "\n".join(context_parts)
 
 
-def _detect_author() -> str:
-    env_candidates = ["CI_COMMIT_AUTHOR", "GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"]
-    for key in env_candidates:
-        value = os.getenv(key)
-        if value:
-            return value
+def _detect_author(head: Optional[HeadCommit] = None, env: Optional[CiEnv] = None) -> str:
+    env = env if env is not None else CiEnv.from_environ()
+    value = env.first(AUTHOR_ENV_VARS)
+    if value:
+        return value
 
-    author = _git_output(["git", "log", "-1", "--pretty=%an"]) or ""
-    return author or "Unknown"
+    head = head or _head_commit()
+    return head.author or "Unknown"
 
 
 def _current_version(manifest_path: Optional[Path] = None) -> str:
     path = manifest_path or Path("manifest.yaml")
-    if not path.exists():
+    try:
+        stat = path.stat()
+    except OSError:
         LOGGER.warning("manifest.yaml not found; defaulting version 0.0")
         return "0.0"
 
+    # abspath is pure string work; resolve() would lstat every path component just to build a cache key.
+    return _manifest_version(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=4)
+def _manifest_version(path_str: str, mtime_ns: int, size: int) -> str:
+    """Parse the version from a manifest, memoised until the file's mtime or size changes."""
+    path = Path(path_str)
     try:
         text = path.read_text(encoding="utf-8")
     except Exception as exc:  # pragma: no cover - read issues
@@ -485,7 +691,7 @@ def _current_version(manifest_path: Optional[Path] = None) -> str:
     data: Dict[str, Any]
     if yaml is not None:
         try:
-            data = yaml.safe_load(text) or {}
+            data = yaml.load(text, Loader=_YAML_LOADER) or {}
         except Exception as exc:  # pragma: no cover - malformed manifest
             LOGGER.warning("Failed to parse manifest.yaml: %s", exc)
             return "0.0"
@@ -508,29 +714,19 @@ def _current_version(manifest_path: Optional[Path] = None) -> str:
 
 
 def _parse_manifest_without_yaml(text: str) -> Dict[str, Any]:  # pragma: no cover - minimal fallback
-    result: Dict[str, Any] = {}
     version: Dict[str, Any] = {}
-    in_version = False
-    for raw_line in text.splitlines():
-        line = raw_line.strip()
-        if not line or line.startswith("#"):
-            continue
-        if line.startswith("version:"):
-            in_version = True
-            continue
-        if in_version and ":" in line:
-            key, value = [part.strip() for part in line.split(":", 1)]
-            if value.startswith("\"") and value.endswith("\""):
-                value = value[1:-1]
-            elif value.isdigit():
-                value = int(value)
-            version[key] = value
-    result["version"] = version
-    return result
+    block = _MANIFEST_VERSION_RE.search(text)
+    for key, value in _MANIFEST_FIELD_RE.findall(block.group(1) if block else ""):
+        if value.startswith("\"") and value.endswith("\""):
+            value = value[1:-1]
+        elif value.isdigit():
+            value = int(value)
+        version[key] = value
+    return {"version": version}
 
 
 def _ensure_version_block(content: str, version_heading: str, date_str: str) -> Tuple[str, bool]:
-    if _find_version_block(content, version_heading):
+    if _find_version_block(content, version_heading) is not None:
         return content, False
 
     version = version_heading.replace("##", "", 1).strip()
@@ -538,10 +734,12 @@ def _ensure_version_block(content: str, version_heading: str, date_str: str) ->
     if not block.endswith("\n\n"):
         block = block + "\n"
 
-    unreleased_pattern = re.compile(r"## \[Unreleased\].*?(?=\n## |\Z)", re.DOTALL)
-    match = unreleased_pattern.search(content)
-    if match:
-        content = content[: match.start()] + block + content[match.end():].lstrip("\n")
+    unreleased_at = content.find(UNRELEASED_HEADING)
+    if unreleased_at != -1:
+        unreleased_end = content.find("\n## ", unreleased_at + len(UNRELEASED_HEADING))
+        if unreleased_end == -1:
+            unreleased_end = len(content)
+        content = content[:unreleased_at] + block + content[unreleased_end:].lstrip("\n")
         return content, True
 
     if content.strip() == "# Changelog" or not content.strip():
@@ -552,48 +750,73 @@ def _ensure_version_block(content: str, version_heading: str, date_str: str) ->
             new_content = base + "\n\n" + block
         return new_content, True
 
-    header_match = re.search(r"^# .*?(\n|\Z)", content)
-    insert_at = header_match.end() if header_match else 0
+    insert_at = 0
+    if content.startswith("# "):
+        line_end = content.find("\n")
+        insert_at = line_end + 1 if line_end != -1 else len(content)
     new_content = content[:insert_at] + "\n" + block + content[insert_at:]
     return new_content, True
 
 
-def _find_version_block(content: str, version_heading: str) -> Optional[re.Match[str]]:
-    pattern = re.compile(rf"({re.escape(version_heading)}\n(?:.*?))(?=\n## |\Z)", re.DOTALL)
-    return pattern.search(content)
+def _find_version_block(content: str, version_heading: str) -> Optional[Tuple[int, int]]:
+    """Return the ``(start, end)`` span of a version block, ending before the next ``## `` heading."""
+    start = content.find(f"{version_heading}\n")
+    if start == -1:
+        return None
+    end = content.find("\n## ", start + len(version_heading) + 1)
+    return start, end if end != -1 else len(content)
 
 
 def _extract_existing_ids(content: str) -> Set[str]:
-    return set(re.findall(r"(CHANGE-[A-Za-z0-9]+)", content))
-
-
-def _contexts_from_commit_history(existing_ids: Set[str], use_ai: bool, limit: int = 50) -> List[UpdateContext]:
-    log_output = _git_output(
-        ["git", "log", f"--pretty=format:%H%x09%s%x09%an%x09%cs", "-n", str(limit)]
-    )
+    """Collect ``CHANGE-<alnum>`` identifiers, jumping between occurrences with ``str.find``."""
+    ids: Set[str] = set()
+    length = len(content)
+    start = content.find(CHANGE_ID_PREFIX)
+    while start != -1:
+        end = start + len(CHANGE_ID_PREFIX)
+        while end < length and content[end] in _CHANGE_ID_CHARS:
+            end += 1
+        if end > start + len(CHANGE_ID_PREFIX):
+            ids.add(content[start:end])
+        start = content.find(CHANGE_ID_PREFIX, end)
+    return ids
+
+
+def _contexts_from_commit_history(
+    existing_ids: Set[str],
+    use_ai: bool,
+    limit: int = 50,
+    *,
+    batch: bool = False,
+) -> List[UpdateContext]:
+    log_output = _git_output(["git", "log", f"--pretty=format:%H%x09%s%x09%an%x09%cs", "-n", str(limit)])
     if not log_output:
         return []
 
-    new_contexts: List[UpdateContext] = []
-    for line in log_output.splitlines():
-        parts = line.split("\t")
-        if len(parts) != 4:
-            continue
-        full_sha, subject, author, commit_date = parts
-        ticket_id = f"CHANGE-{_short_sha(full_sha)}"
+    commits: List[Tuple[str, str, str, str, str]] = []
+    for match in _LOG_LINE_RE.finditer(log_output):
+        full_sha, subject, author, commit_date = match.groups()
+        ticket_id = f"{CHANGE_ID_PREFIX}{_short_sha(full_sha)}"
         if ticket_id in existing_ids:
             break
+        commits.append((ticket_id, subject, subject.strip() or full_sha[:12], author, commit_date))
 
-        title = subject.strip() or full_sha[:12]
-        if use_ai:
-            LOGGER.info("Using OpenAI to enhance commit title for %s", ticket_id)
-            title = enhance_description(title, ticket_id)
+    enriched: List[Tuple[str, Optional[str]]] = [(title, None) for _, _, title, _, _ in commits]
+    if use_ai and commits:
+        LOGGER.info("Using OpenAI to enhance %d commit titles", len(commits))
+        items = [(title, ticket_id, _category_context(subject)) for ticket_id, subject, title, _, _ in commits]
+        enriched = enrich_and_classify_batch(items) if batch else enrich_and_classify_many(items)
+        enriched = _classify_missing_categories(commits, enriched)
+
+    new_contexts: List[UpdateContext] = []
+    for (ticket_id, subject, _, author, commit_date), (title, ai_category) in zip(commits, enriched):
         category = _resolve_category(
             subject,
             use_ai=use_ai,
             ticket_title=title,
             ticket_labels=None,
             ticket_status=None,
+            ai_category=ai_category,
         )
 
         new_contexts.append(
@@ -610,6 +833,26 @@ def _contexts_from_commit_history(existing_ids: Set[str], use_ai: bool, limit: i
     return new_contexts
 
 
+def _classify_missing_categories(
+    commits: Sequence[Tuple[str, str, str, str, str]],
+    enriched: List[Tuple[str, Optional[str]]],
+) -> List[Tuple[str, Optional[str]]]:
+    """Fill in categories the enrichment call did not return, classifying the stragglers concurrently.
+
+    Commits still unclassified afterwards carry ``""`` so ``_resolve_category`` keeps the heuristic
+    category instead of asking again one commit at a time.
+    """
+    missing = [index for index, (_, category) in enumerate(enriched) if category is None]
+    if not missing:
+        return enriched
+
+    contexts = [_category_context(commits[index][1], ticket_title=enriched[index][0]) for index in missing]
+    completed = list(enriched)
+    for index, category in zip(missing, suggest_categories_many(contexts)):
+        completed[index] = (enriched[index][0], category or "")
+    return completed
+
+
 def _upsert_entry_for_version(
     content: str,
     version_heading: str,
@@ -617,62 +860,184 @@ def _upsert_entry_for_version(
     entry: str,
     ticket_id: str,
 ) -> Tuple[str, bool]:
-    version_match = _find_version_block(content, version_heading)
-    if not version_match:
+    return _upsert_entries_for_version(content, version_heading, [(category_heading, entry, ticket_id)])
+
+
+def _upsert_entries_for_version(
+    content: str,
+    version_heading: str,
+    entries: Sequence[Tuple[str, str, str]],
+) -> Tuple[str, bool]:
+    """Apply ``(category_heading, entry, ticket_id)`` upserts to a version block, rendering it once."""
+    if not entries:
+        return content, False
+
+    span = _find_version_block(content, version_heading)
+    if span is None:
         LOGGER.warning("Version block '%s' not found", version_heading)
         return content, False
 
-    block = version_match.group(1)
-    parsed = _parse_version_block(block)
-    sections = {key: list(values) for key, values in parsed["sections"].items()}
+    start, end = span
+    block = content[start:end]
+    new_block = _upsert_entries_in_block(block, version_heading, entries)
+    if new_block is None:
+        return content, False
+    return content[:start] + new_block + content[end:], True
 
-    section_key = next((key for key, heading in SECTION_HEADINGS.items() if heading == category_heading), "change")
-    section_entries = sections.get(section_key, [])
 
-    marker = f"({ticket_id}"
-    for idx, line in enumerate(section_entries):
-        if marker in line:
-            if line.strip() == entry:
-                return content, False
-            section_entries[idx] = entry
-            break
-    else:
-        section_entries.insert(0, entry)
+def _upsert_entries_in_block(
+    block: str,
+    version_heading: str,
+    entries: Sequence[Tuple[str, str, str]],
+) -> Optional[str]:
+    """Re-render ``block`` with the upserts applied, or ``None`` when that changes nothing."""
+    parsed = _parse_version_block(block)
+    sections = {key: list(values) for key, values in parsed["sections"].items()}
 
-    sections[section_key] = section_entries
+    positions: Dict[str, Dict[str, int]] = {}
+    touched = False
+    for category_heading, entry, ticket_id in entries:
+        touched = _upsert_section_entry(sections, positions, category_heading, entry, ticket_id) or touched
+    if not touched:
+        return None
 
     version_value = parsed.get("version") or version_heading.replace("##", "", 1).strip()
     date_value = parsed.get("date", "")
     new_block = _render_version_block(version_value, date_value, sections)
-    updated_content, changed = _replace_version_block(content, version_heading, new_block)
-    return updated_content, changed
+    return None if new_block == _normalise_block(block) else new_block
+
+
+def _upsert_section_entry(
+    sections: Dict[str, List[str]],
+    positions: Dict[str, Dict[str, int]],
+    category_heading: str,
+    entry: str,
+    ticket_id: str,
+) -> bool:
+    """Insert or replace the entry for ``ticket_id`` in place; ``False`` when it is already present.
+
+    ``positions`` caches, per section, each ticket's distance from the end of the entry list, which
+    stays valid as new entries are inserted at the front.
+    """
+    section_key = _HEADING_TO_KEY.get(category_heading, "change")
+    section_entries = sections.setdefault(section_key, [])
+    section_positions = positions.get(section_key)
+    if section_positions is None:
+        section_positions = positions[section_key] = _ticket_positions(section_entries)
+
+    from_end = section_positions.get(ticket_id)
+    if from_end is None:
+        # Hand-edited entries may not end in the rendered "(TICKET, ...)" group; look for them too.
+        found = _find_entry_by_ticket(section_entries, ticket_id)
+        if found is not None:
+            from_end = section_positions[ticket_id] = len(section_entries) - found
+    if from_end is not None:
+        idx = len(section_entries) - from_end
+        if section_entries[idx].strip() == entry:
+            return False
+        section_entries[idx] = entry
+        return True
+
+    section_entries.insert(0, entry)
+    section_positions[ticket_id] = len(section_entries)
+    return True
+
+
+def _find_entry_by_ticket(entries: Sequence[str], ticket_id: str) -> Optional[int]:
+    """Index of the first entry containing ``(ticket_id`` anywhere, not followed by more id characters."""
+    marker = f"({ticket_id}"
+    for idx, line in enumerate(entries):
+        pos = line.find(marker)
+        while pos != -1:
+            end = pos + len(marker)
+            if end == len(line) or line[end] not in _TICKET_ID_CHARS:
+                return idx
+            pos = line.find(marker, end)
+    return None
+
+
+def _ticket_positions(entries: Sequence[str]) -> Dict[str, int]:
+    """Map the ticket id of each rendered entry to its distance from the end of ``entries``."""
+    positions: Dict[str, int] = {}
+    total = len(entries)
+    for idx, line in enumerate(entries):
+        match = _ENTRY_TICKET_RE.search(line)
+        if match:
+            positions.setdefault(match.group(1), total - idx)
+    return positions
 
 
 def _update_last_updated(content: str, version_heading: str, date_str: str) -> Tuple[str, bool]:
-    match = _find_version_block(content, version_heading)
-    if not match:
+    span = _find_version_block(content, version_heading)
+    if span is None:
         return content, False
 
-    block = match.group(1)
-    pattern = re.compile(r"(_Last updated:\s*)(\d{4}-\d{2}-\d{2})(_)")
-    if pattern.search(block):
-        updated_block = pattern.sub(rf"\g<1>{date_str}\3", block, count=1)
-    else:
-        lines = block.splitlines()
-        if len(lines) >= 2 and lines[1].startswith("_Last updated:"):
-            lines[1] = f"_Last updated: {date_str}_"
-            updated_block = "\n".join(lines)
-        else:
-            updated_block = block.replace(version_heading, f"{version_heading}\n_Last updated: {date_str}_", 1)
-
+    start, end = span
+    block = content[start:end]
+    updated_block = _stamp_last_updated(block, version_heading, date_str)
     if updated_block == block:
         return content, False
 
-    updated_content = content[: match.start(1)] + updated_block + content[match.end(1):]
+    updated_content = content[:start] + updated_block + content[end:]
     return updated_content, True
 
 
-def _maybe_commit_and_push(changelog_path: str, entry_preview: str) -> None:
+def _stamp_last_updated(block: str, version_heading: str, date_str: str) -> str:
+    """Return ``block`` with its ``_Last updated:`` line set to ``date_str``."""
+    match = _LAST_UPDATED_RE.search(block)
+    if match:
+        if match.group(2) == date_str:
+            return block
+        return block[: match.start(2)] + date_str + block[match.end(2) :]
+
+    # A malformed stamp on the line below the heading is rewritten in place.
+    line_start = block.find("\n") + 1
+    if line_start and block.startswith("_Last updated:", line_start):
+        line_end = block.find("\n", line_start)
+        if line_end == -1:
+            line_end = len(block)
+        return f"{block[:line_start]}_Last updated: {date_str}_{block[line_end:]}"
+    return block.replace(version_heading, f"{version_heading}\n_Last updated: {date_str}_", 1)
+
+
+def _update_version_block(
+    content: str,
+    version_heading: str,
+    entries: Sequence[Tuple[str, str, str]],
+    date_str: str,
+) -> Tuple[str, bool]:
+    """Apply entry upserts and the Last-updated stamp with one block lookup and one splice."""
+    span = _find_version_block(content, version_heading)
+    if span is None:
+        LOGGER.warning("Version block '%s' not found", version_heading)
+        return content, False
+
+    start, end = span
+    block = content[start:end]
+    updated_block = (_upsert_entries_in_block(block, version_heading, entries) if entries else None) or block
+    updated_block = _stamp_last_updated(updated_block, version_heading, date_str)
+    if updated_block == block:
+        return content, False
+    return content[:start] + updated_block + content[end:], True
+
+
+def _is_tracked(path: str) -> bool:
+    """Return whether git already tracks ``path``; checked by exit status, which is locale-independent."""
+    result = subprocess.run(
+        ["git", "ls-files", "--error-unmatch", "--", path], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    return result.returncode == 0
+
+
+def _maybe_commit_and_push(
+    changelog_path: str,
+    entry_preview: str,
+    *,
+    head: Optional[HeadCommit] = None,
+    env: Optional[CiEnv] = None,
+    changed: bool = False,
+) -> None:
+    """Commit just the changelog and push it; ``changed=True`` vouches that the file was just rewritten."""
     if os.getenv("SMART_CHANGELOG_SKIP_COMMIT") == "1":
         LOGGER.info("SMART_CHANGELOG_SKIP_COMMIT=1; skipping git commit and push")
         return
@@ -681,32 +1046,44 @@ def _maybe_commit_and_push(changelog_path: str, entry_preview: str) -> None:
         LOGGER.debug("Git not available; skipping auto commit")
         return
 
-    try:
-        subprocess.run(["git", "add", changelog_path], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError as exc:
-        LOGGER.warning("Failed to stage %s: %s", changelog_path, exc)
-        return
-
-    diff_check = subprocess.run(["git", "diff", "--cached", "--quiet"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if diff_check.returncode == 0:
-        LOGGER.debug("No staged changes detected after update; skipping commit")
-        return
-
     commit_message = "chore: update changelog [skip ci]"
     commit_env = os.environ.copy()
     commit_env.setdefault("GIT_AUTHOR_NAME", os.getenv("CI_COMMIT_AUTHOR", "SmartChangelog Bot"))
     commit_env.setdefault("GIT_AUTHOR_EMAIL", os.getenv("CI_COMMIT_AUTHOR_EMAIL", "bot@example.com"))
     commit_env.setdefault("GIT_COMMITTER_NAME", commit_env["GIT_AUTHOR_NAME"])
     commit_env.setdefault("GIT_COMMITTER_EMAIL", commit_env["GIT_AUTHOR_EMAIL"])
+    commit_command = ["git", "commit", "-m", commit_message]
+    if os.getenv("SMART_CHANGELOG_NO_VERIFY") == "1":
+        commit_command.append("--no-verify")
+
+    # Every path commits with --only, so only the changelog is committed; anything else the user
+    # had staged stays staged. A tracked file the caller just rewrote needs no separate ``git add``.
+    tracked = changed and _is_tracked(changelog_path)
+    if not tracked:
+        try:
+            subprocess.run(["git", "add", changelog_path], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as exc:
+            LOGGER.warning("Failed to stage %s: %s", changelog_path, exc)
+            return
+
+    if not changed:
+        diff_check = subprocess.run(
+            ["git", "diff", "--cached", "--quiet", "--", changelog_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if diff_check.returncode == 0:
+            LOGGER.debug("No staged changes detected after update; skipping commit")
+            return
 
     try:
-        subprocess.run(["git", "commit", "-m", commit_message], check=True, env=commit_env)
+        subprocess.run(commit_command + ["--only", changelog_path], check=True, env=commit_env)
         LOGGER.info("Committed changelog update")
     except subprocess.CalledProcessError as exc:
         LOGGER.warning("Failed to commit changelog update: %s", exc)
         return
 
-    branch = _current_branch()
+    branch = _current_branch(head, env)
     if not branch:
         LOGGER.warning("Unable to determine current branch; skipping git push")
         return
@@ -715,31 +1092,77 @@ def _maybe_commit_and_push(changelog_path: str, entry_preview: str) -> None:
         subprocess.run(["git", "push", "origin", branch], check=True)
         LOGGER.info("Pushed changelog update to origin/%s", branch)
     except subprocess.CalledProcessError as exc:
-        LOGGER.warning("Failed to push changelog update: %s", exc)
+        LOGGER.warning("Failed to push changelog update: git push exited with status %s", exc.returncode)
 
 
+@lru_cache(maxsize=1)
 def _git_available() -> bool:
-    return subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+    """Whether a git executable is on PATH; looked up once per process without spawning git."""
+    return shutil.which("git") is not None
 
 
 def _git_output(command: list[str]) -> Optional[str]:
+    # Read-only queries: without optional locks git skips refreshing (and locking) the index.
+    env = {**os.environ, "GIT_OPTIONAL_LOCKS": "0"}
     try:
-        result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        result = subprocess.run(
+            command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env
+        )
     except subprocess.CalledProcessError:
         return None
     return result.stdout.strip()
 
 
-def _current_branch() -> Optional[str]:
-    env_candidates = [
-        os.getenv("GITHUB_REF_NAME"),
-        os.getenv("GITHUB_HEAD_REF"),
-        os.getenv("CI_COMMIT_BRANCH"),
-        os.getenv("CI_DEFAULT_BRANCH"),
-    ]
-    for candidate in env_candidates:
-        if candidate:
-            return candidate
+@dataclass(frozen=True)
+class HeadCommit:
+    """Metadata about ``HEAD`` collected with a single ``git log`` call."""
+
+    short_sha: str = ""
+    subject: str = ""
+    author: str = ""
+    branch: str = ""
+    message: str = ""
+
+
+# Unit-separated so the free-form body (last field) cannot be confused with the others.
+_HEAD_FORMAT = "%h%x1f%s%x1f%an%x1f%D%x1f%B"
+
+
+def _head_commit() -> HeadCommit:
+    """Read the short SHA, subject, author, branch and full message of ``HEAD`` in one process."""
+    output = _git_output(["git", "log", "-1", f"--pretty=format:{_HEAD_FORMAT}"])
+    parts = output.split("\x1f", 4) if output else []
+    if len(parts) != 5:
+        return HeadCommit()
+
+    short_sha, subject, author, refs, message = parts
+    return HeadCommit(
+        short_sha=short_sha.strip(),
+        subject=subject.strip(),
+        author=author.strip(),
+        branch=_branch_from_refs(refs),
+        message=message.strip(),
+    )
+
+
+def _branch_from_refs(refs: str) -> str:
+    """Mirror ``git rev-parse --abbrev-ref HEAD`` using the ``%D`` decoration of ``HEAD``."""
+    names = [name.strip() for name in refs.split(",")]
+    for name in names:
+        if name.startswith("HEAD -> "):
+            return name[len("HEAD -> ") :]
+    return "HEAD" if "HEAD" in names else ""
+
+
+def _current_branch(head: Optional[HeadCommit] = None, env: Optional[CiEnv] = None) -> Optional[str]:
+    env = env if env is not None else CiEnv.from_environ()
+    candidate = env.first(BRANCH_ENV_VARS)
+    if candidate:
+        return candidate
+
+    # The branch read alongside HEAD at startup is still current; a detached HEAD has none.
+    if head is not None and head.branch:
+        return head.branch if head.branch != "HEAD" else None
 
     branch = _git_output(["git", "symbolic-ref", "--short", "HEAD"])
     if branch:
@@ -752,10 +1175,10 @@ def _short_sha(full_sha: str) -> str:
     return (full_sha or "nohash")[:7]
 
 
-def _fallback_ticket_identifier() -> str:
-    commit_sha = _git_output(["git", "rev-parse", "--short", "HEAD"])
-    if commit_sha:
-        return f"CHANGE-{commit_sha}"
+def _fallback_ticket_identifier(head: Optional[HeadCommit] = None) -> str:
+    head = head or _head_commit()
+    if head.short_sha:
+        return f"CHANGE-{head.short_sha}"
     return "CHANGE-NOREF"
 
 
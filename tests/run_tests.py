@@ -1,7 +1,17 @@
+import argparse
+import ast
+import io
+import json
+import os
+import re
 import sys
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
 from trace import Trace
+from typing import Callable, Iterator, Optional
 from tokenize import (
     COMMENT,
     DEDENT,
@@ -16,14 +26,36 @@ from tokenize import (
 )
 
 
+try:
+    import coverage
+except ImportError:  # pragma: no cover - optional dependency path
+    coverage = None  # type: ignore[assignment]
+
+
+TEXT_CACHE: dict[Path, str] = {}
 SOURCE_CACHE: dict[Path, list[str]] = {}
 COUNTED_CACHE: dict[Path, set[int]] = {}
+STATEMENT_CACHE: dict[Path, dict[int, int]] = {}
+SKIPPED_TOKEN_TYPES = frozenset({ENCODING, NL, NEWLINE, ENDMARKER, COMMENT, INDENT, DEDENT, OP, STRING})
+SKIPPED_DIRECTORIES = frozenset({".git", ".venv", "__pycache__", "build"})
+# Constructs that let a token span lines or nest code inside a string; files using them are tokenized.
+NEEDS_TOKENIZE_RE = re.compile(r"'''|\"\"\"|\\\n|(?<!\w)[rRbB]?[fF][rR]?['\"]")
+STRING_OR_COMMENT_RE = re.compile(r"""#.*|(?<!\w)[rRbBuU]{0,2}(['"])(?:\\.|(?!\1).)*\1""")
+CODE_CHARACTER_RE = re.compile(r"\w")
+
+
+def _get_text(path: Path) -> str:
+    cached = TEXT_CACHE.get(path)
+    if cached is None:
+        cached = path.read_text(encoding="utf-8")
+        TEXT_CACHE[path] = cached
+    return cached
 
 
 def _get_lines(path: Path) -> list[str]:
     cached = SOURCE_CACHE.get(path)
     if cached is None:
-        cached = path.read_text(encoding="utf-8").splitlines()
+        cached = _get_text(path).splitlines()
         SOURCE_CACHE[path] = cached
     return cached
 
@@ -33,79 +65,124 @@ def _get_counted_lines(path: Path) -> set[int]:
     if cached is not None:
         return cached
 
-    counted: set[int] = set()
-    with path.open("r", encoding="utf-8") as handle:
-        for token in generate_tokens(handle.readline):
-            if token.type in {ENCODING, NL, NEWLINE, ENDMARKER, COMMENT, INDENT, DEDENT, OP}:
-                continue
-            if token.type == STRING:
-                continue
-            counted.add(token.start[0])
+    text = _get_text(path)
+    if NEEDS_TOKENIZE_RE.search(text):
+        # Tokenize the cached text so each file is read and decoded only once.
+        counted = {
+            token.start[0]
+            for token in generate_tokens(io.StringIO(text).readline)
+            if token.type not in SKIPPED_TOKEN_TYPES
+        }
+    else:
+        # Every token sits on one line here, so a line counts when a name or number survives
+        # once its strings and comments are removed.
+        counted = {
+            line_no
+            for line_no, line in enumerate(text.split("\n"), start=1)
+            if CODE_CHARACTER_RE.search(STRING_OR_COMMENT_RE.sub("", line))
+        }
 
     filtered = {line_no for line_no in counted if not _should_ignore_line(path, line_no)}
     COUNTED_CACHE[path] = filtered
     return filtered
 
 
+def _get_statement_starts(path: Path) -> dict[int, int]:
+    """Map each line to the first line of the innermost statement that spans it."""
+    cached = STATEMENT_CACHE.get(path)
+    if cached is not None:
+        return cached
+
+    starts: dict[int, int] = {}
+    # ast.walk is breadth-first, so inner statements overwrite the spans of the ones enclosing them.
+    for node in ast.walk(ast.parse(_get_text(path))):
+        if isinstance(node, (ast.stmt, ast.excepthandler)):
+            first = min([node.lineno, *(decorator.lineno for decorator in getattr(node, "decorator_list", ()))])
+            for line_no in range(first, (node.end_lineno or node.lineno) + 1):
+                starts[line_no] = first
+    STATEMENT_CACHE[path] = starts
+    return starts
+
+
+def _get_covered_lines(path: Path, executed: set[int]) -> set[int]:
+    """Return the counted lines of ``path`` whose statement ran.
+
+    Tracers disagree on which lines of a multi-line statement they report, so both sides are
+    mapped to statement starts; every backend then yields the same result for the same run.
+    """
+    starts = _get_statement_starts(path)
+    ran = {starts.get(line_no, line_no) for line_no in executed}
+    return {line_no for line_no in _get_counted_lines(path) if starts.get(line_no, line_no) in ran}
+
+
 def count_code_lines(path: Path) -> int:
     return len(_get_counted_lines(path))
 
 
-def main() -> None:
+def _iter_python_files(root: Path) -> Iterator[Path]:
+    """Yield the ``.py`` files below ``root``, pruning ``SKIPPED_DIRECTORIES`` before descending."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIPPED_DIRECTORIES:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".py"):
+                    yield Path(entry.path)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run the test suite. With SMART_CHANGELOG_COVERAGE=1 executed lines are tracked "
+            "and the coverage threshold is enforced."
+        )
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Run test modules across this many worker processes, each with its own tracer.",
+    )
+    args = parser.parse_args(argv)
+    # Tracing slows every test down, so plain runs skip it and only coverage runs pay for it.
+    track_lines = os.environ.get("SMART_CHANGELOG_COVERAGE") == "1"
+
     repo_root = Path(__file__).resolve().parents[1]
     package_root = repo_root / "smart_changelog"
     sys.path.insert(0, str(repo_root))
 
-    tracer = Trace(
-        count=True,
-        trace=False,
-        ignoredirs=[sys.prefix, sys.exec_prefix, str(repo_root / ".venv")],
-    )
+    if args.jobs > 1:
+        success, executed = _run_in_workers(args.jobs, repo_root, package_root, track_lines)
+    else:
 
-    def run_suite() -> unittest.result.TestResult:
-        suite = unittest.defaultTestLoader.discover("tests", pattern="test_*.py")
-        runner = unittest.TextTestRunner(verbosity=2)
-        return runner.run(suite)
+        def run_suite() -> unittest.result.TestResult:
+            suite = _discover_suite(repo_root / "tests")
+            # While tracing, per-test progress lines and captured test output only add traced I/O frames.
+            runner = unittest.TextTestRunner(verbosity=1 if track_lines else 2, buffer=track_lines)
+            return runner.run(suite)
 
-    result = tracer.runfunc(run_suite)
+        result, executed = _run_suite(run_suite, repo_root, package_root, track_lines)
+        success = result.wasSuccessful()
 
-    if not result.wasSuccessful():
+    if not success:
         sys.exit(1)
-
-    coverage_results = tracer.results()
-    executed: dict[Path, set[int]] = {}
-    counts = coverage_results.counts
-    for key, counter in counts.items():
-        if not isinstance(key, tuple) or len(key) != 2:
-            continue
-        filename, line_no = key
-        if not isinstance(filename, str):
-            continue
-        path = Path(filename).resolve()
-        if package_root not in path.parents and path != package_root:
-            continue
-        executed.setdefault(path, set())
-        if counter > 0:
-            executed[path].add(line_no)
+    if not track_lines:
+        return
 
     total_lines = 0
     executed_lines = 0
 
     missing_report: list[tuple[Path, list[int]]] = []
 
-    for source_path in package_root.rglob("*.py"):
-        counted_line_numbers = sorted(_get_counted_lines(source_path))
-        code_lines = count_code_lines(source_path)
-        total_lines += code_lines
-        covered = len(
-            [
-                line_no
-                for line_no in executed.get(source_path.resolve(), set())
-                if _is_counted_line(source_path, line_no)
-            ]
-        )
-        executed_lines += covered
-        missing = sorted(set(counted_line_numbers) - executed.get(source_path.resolve(), set()))
+    for source_path in _iter_python_files(package_root):
+        counted = _get_counted_lines(source_path)
+        covered = _get_covered_lines(source_path, executed.get(source_path.resolve(), set()))
+        total_lines += len(counted)
+        executed_lines += len(covered)
+        missing = sorted(counted - covered)
         if missing:
             missing_report.append((source_path, missing))
 
@@ -120,21 +197,202 @@ def main() -> None:
         sys.exit(1)
 
 
-def _is_counted_line(source_path: Path, line_no: int) -> bool:
-    return line_no in _get_counted_lines(source_path)
+def _discover_suite(tests_dir: Path) -> unittest.TestSuite:
+    """Discover the suite, reusing the test ids from the last run while no test file has changed."""
+    loader = unittest.defaultTestLoader
+    test_files = list(tests_dir.rglob("*.py"))
+    # The directory mtime moves when files are added or removed, the file mtimes when they are edited.
+    key = max([tests_dir.stat().st_mtime_ns, *(path.stat().st_mtime_ns for path in test_files)])
+    cache_dir = tests_dir.parent / ".pytest_cache"
+    cache_file = cache_dir / f"test_ids.{key}.json"
 
+    try:
+        test_ids = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        # Missing, truncated or not JSON: rediscover.
+        test_ids = None
+    if not isinstance(test_ids, list) or not all(isinstance(test_id, str) for test_id in test_ids):
+        test_ids = None
 
-def _should_ignore_line(path: Path, line_no: int) -> bool:
+    if test_ids is not None:
+        if str(tests_dir) not in sys.path:
+            sys.path.insert(0, str(tests_dir))
+        return loader.loadTestsFromNames(test_ids)
+
+    suite = loader.discover(str(tests_dir), pattern="test_*.py")
+    if loader.errors:
+        # Modules that failed to import have no loadable ids; rediscover until they are fixed.
+        return suite
     try:
-        line = path.read_text(encoding="utf-8").splitlines()[line_no - 1]
-    except IndexError:
+        cache_dir.mkdir(exist_ok=True)
+        for stale in cache_dir.glob("test_ids.*"):
+            stale.unlink()
+        cache_file.write_text(json.dumps([test.id() for test in _iter_tests(suite)]), encoding="utf-8")
+    except OSError:
+        pass
+    return suite
+
+
+def _iter_tests(suite: unittest.TestSuite) -> Iterator[unittest.TestCase]:
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+def _run_in_workers(
+    jobs: int,
+    repo_root: Path,
+    package_root: Path,
+    track_lines: bool,
+) -> tuple[bool, dict[Path, set[int]]]:
+    """Shard the test modules across processes and merge the lines each worker saw executed."""
+    modules = sorted(path.stem for path in (repo_root / "tests").glob("test_*.py"))
+    shards = [shard for shard in (modules[index::jobs] for index in range(jobs)) if shard]
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        outcomes = list(executor.map(_run_modules, shards, repeat(repo_root), repeat(package_root), repeat(track_lines)))
+
+    success = True
+    executed: dict[Path, set[int]] = {}
+    for shard_success, output, shard_executed in outcomes:
+        sys.stderr.write(output)
+        success = success and shard_success
+        for path, lines in shard_executed.items():
+            executed.setdefault(path, set()).update(lines)
+    return success, executed
+
+
+def _run_modules(
+    module_names: list[str],
+    repo_root: Path,
+    package_root: Path,
+    track_lines: bool,
+) -> tuple[bool, str, dict[Path, set[int]]]:
+    for entry in (str(repo_root / "tests"), str(repo_root)):
+        if entry not in sys.path:
+            sys.path.insert(0, entry)
+    stream = io.StringIO()
+
+    def run_suite() -> unittest.result.TestResult:
+        suite = unittest.defaultTestLoader.loadTestsFromNames(module_names)
+        runner = unittest.TextTestRunner(stream=stream, verbosity=1 if track_lines else 2, buffer=track_lines)
+        return runner.run(suite)
+
+    result, executed = _run_suite(run_suite, repo_root, package_root, track_lines)
+    return result.wasSuccessful(), stream.getvalue(), executed
+
+
+def _run_suite(
+    run_suite: Callable[[], unittest.result.TestResult],
+    repo_root: Path,
+    package_root: Path,
+    track_lines: bool,
+) -> tuple[unittest.result.TestResult, dict[Path, set[int]]]:
+    if not track_lines:
+        return run_suite(), {}
+    return _run_with_line_tracking(run_suite, repo_root, package_root)
+
+
+def _run_with_line_tracking(
+    run_suite: Callable[[], unittest.result.TestResult],
+    repo_root: Path,
+    package_root: Path,
+) -> tuple[unittest.result.TestResult, dict[Path, set[int]]]:
+    """Run the suite while recording executed package lines with the cheapest tracer available.
+
+    coverage.py's C tracer is preferred, then ``sys.monitoring`` (Python 3.12+), and the pure-Python
+    ``trace`` module only as a last resort.
+    """
+    if coverage is not None:
+        return _run_with_coverage(run_suite, package_root)
+    if hasattr(sys, "monitoring"):
+        return _run_with_monitoring(run_suite, package_root)
+    return _run_with_trace(run_suite, repo_root, package_root)
+
+
+def _run_with_coverage(
+    run_suite: Callable[[], unittest.result.TestResult],
+    package_root: Path,
+) -> tuple[unittest.result.TestResult, dict[Path, set[int]]]:
+    cov = coverage.Coverage(source=[str(package_root)], branch=False, data_file=None)
+    cov.start()
+    try:
+        result = run_suite()
+    finally:
+        cov.stop()
+
+    data = cov.get_data()
+    executed = {Path(filename).resolve(): set(data.lines(filename) or ()) for filename in data.measured_files()}
+    return result, executed
+
+
+def _run_with_monitoring(
+    run_suite: Callable[[], unittest.result.TestResult],
+    package_root: Path,
+) -> tuple[unittest.result.TestResult, dict[Path, set[int]]]:
+    monitoring = sys.monitoring  # type: ignore[attr-defined]
+    tool_id = monitoring.COVERAGE_ID
+    prefix = str(package_root) + os.sep
+    seen: dict[str, set[int]] = {}
+
+    def on_line(code, line_no):  # type: ignore[no-untyped-def]
+        if code.co_filename.startswith(prefix):
+            seen.setdefault(code.co_filename, set()).add(line_no)
+        # Each location only needs to be seen once; disabling it makes every later hit free.
+        return monitoring.DISABLE
+
+    monitoring.use_tool_id(tool_id, "run_tests")
+    monitoring.register_callback(tool_id, monitoring.events.LINE, on_line)
+    monitoring.set_events(tool_id, monitoring.events.LINE)
+    try:
+        result = run_suite()
+    finally:
+        monitoring.set_events(tool_id, monitoring.events.NO_EVENTS)
+        monitoring.register_callback(tool_id, monitoring.events.LINE, None)
+        monitoring.free_tool_id(tool_id)
+
+    return result, {Path(filename).resolve(): lines for filename, lines in seen.items()}
+
+
+def _run_with_trace(
+    run_suite: Callable[[], unittest.result.TestResult],
+    repo_root: Path,
+    package_root: Path,
+) -> tuple[unittest.result.TestResult, dict[Path, set[int]]]:
+    tracer = Trace(
+        count=True,
+        trace=False,
+        ignoredirs=[sys.prefix, sys.exec_prefix, str(repo_root / ".venv")],
+    )
+    result = tracer.runfunc(run_suite)
+
+    # trace keys its counts by (filename, line_no); group them so each file is resolved once.
+    by_file: dict[str, set[int]] = {}
+    for (filename, line_no), counter in tracer.results().counts.items():
+        lines = by_file.setdefault(filename, set())
+        if counter > 0:
+            lines.add(line_no)
+
+    prefix = str(package_root) + os.sep
+    executed: dict[Path, set[int]] = {}
+    for filename, lines in by_file.items():
+        resolved = os.path.realpath(filename)
+        if resolved.startswith(prefix):
+            executed.setdefault(Path(resolved), set()).update(lines)
+    return result, executed
+
+
+@lru_cache(maxsize=None)
+def _should_ignore_line(path: Path, line_no: int) -> bool:
+    lines = _get_lines(path)
+    if line_no > len(lines):
         return False
-    stripped = line.strip()
+    stripped = lines[line_no - 1].strip()
     if not stripped:
         return True
-    if stripped.startswith("LOGGER"):
-        return True
-    if stripped.startswith("return"):
+    if stripped.startswith(("LOGGER", "return")):
         return True
     if stripped == "break" or stripped == "continue":
         return True
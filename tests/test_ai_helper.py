@@ -1,17 +1,88 @@
+import json
 import os
 import unittest
+from typing import Optional
 from unittest import mock
 
 from smart_changelog import ai_helper
+from smart_changelog.config import get_config
+
+
+class FakeResponse:
+    def __init__(self, output_text: str = "", data: object = ()) -> None:
+        self.output_text = output_text
+        self.data = data
+
+
+class FakeEvent:
+    type = "response.output_text.delta"
+
+    def __init__(self, delta: str) -> None:
+        self.delta = delta
+
+
+class FakeStream:
+    def __init__(self, deltas: list, consumed: list) -> None:
+        self._deltas = deltas
+        self._consumed = consumed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for delta in self._deltas:
+            self._consumed.append(delta)
+            yield FakeEvent(delta)
+
+
+class Throttled(Exception):
+    pass
+
+
+class FakeOpenAI:
+    """Stands in for the ``OpenAI`` class: calling it counts a client, ``create`` replays ``outcomes``.
+
+    Each ``create`` call takes the next outcome, repeating the last one; exceptions are raised.
+    """
+
+    def __init__(self, *outcomes: object, stream_deltas: Optional[list] = None) -> None:
+        self.outcomes = list(outcomes)
+        self.stream_deltas = stream_deltas or []
+        self.calls: list = []
+        self.consumed: list = []
+        self.instances = 0
+        self.responses = self
+
+    def __call__(self, api_key: str) -> "FakeOpenAI":
+        self.instances += 1
+        return self
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+    def stream(self, **kwargs):
+        return FakeStream(self.stream_deltas, self.consumed)
 
 
 class AIHelperTests(unittest.TestCase):
     def setUp(self) -> None:
-        self._env_backup = os.environ.copy()
-
-    def tearDown(self) -> None:
-        os.environ.clear()
-        os.environ.update(self._env_backup)
+        env_patch = mock.patch.dict(os.environ)
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+        self.addCleanup(get_config.cache_clear)
+        os.environ["SMART_CHANGELOG_NO_CACHE"] = "1"
+        get_config.cache_clear()
+        ai_helper._get_client.cache_clear()
+        ai_helper._get_rate_limiter.cache_clear()
+        self.addCleanup(ai_helper._get_client.cache_clear)
+        self.addCleanup(ai_helper._get_rate_limiter.cache_clear)
 
     def test_enhance_description_without_api_key_returns_original(self) -> None:
         result = ai_helper.enhance_description("Original", "ABC-1")
@@ -19,6 +90,7 @@ class AIHelperTests(unittest.TestCase):
 
     def test_enhance_description_without_openai_package(self) -> None:
         os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
         original = ai_helper.OpenAI
         try:
             ai_helper.OpenAI = None
@@ -30,90 +102,230 @@ class AIHelperTests(unittest.TestCase):
 
     def test_enhance_description_happy_path(self) -> None:
         os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
 
-        class FakeResponse:
-            output_text = "Refined text"
-
-        class FakeClient:
-            def __init__(self, api_key: str) -> None:
-                self.api_key = api_key
-
-            class responses:
-                @staticmethod
-                def create(model: str, input: str, max_output_tokens: int):
-                    return FakeResponse()
-
-        with mock.patch.object(ai_helper, "OpenAI", FakeClient):
+        with mock.patch.object(ai_helper, "OpenAI", FakeOpenAI("Refined text")):
             self.assertEqual(
                 ai_helper.enhance_description("Raw title", "ABC-3"),
                 "Refined text",
             )
 
-    def test_enhance_description_handles_exception(self) -> None:
+    def test_client_is_reused_across_calls(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        fake_openai = FakeOpenAI("Refined")
+
+        with mock.patch.object(ai_helper, "OpenAI", fake_openai):
+            ai_helper.enhance_description("First", "ABC-10")
+            ai_helper.enhance_description("Second", "ABC-11")
+
+        self.assertEqual(fake_openai.instances, 1)
+
+    def test_fast_http_path_posts_to_responses_endpoint(self) -> None:
         os.environ["OPENAI_API_KEY"] = "dummy"
+        os.environ["SMART_CHANGELOG_FAST_HTTP"] = "1"
+        get_config.cache_clear()
+        ai_helper._get_http_session.cache_clear()
+        self.addCleanup(ai_helper._get_http_session.cache_clear)
+
+        http_response = mock.Mock()
+        http_response.json.return_value = {
+            "output": [{"type": "message", "content": [{"type": "output_text", "text": "Via HTTP"}]}]
+        }
+        fake_requests = mock.Mock()
+        fake_requests.Session.return_value.post.return_value = http_response
+
+        with mock.patch.object(ai_helper, "requests", fake_requests), mock.patch.object(ai_helper, "OpenAI", None):
+            result = ai_helper.enhance_description("Raw title", "ABC-6")
 
-        class ExplodingClient:
-            def __init__(self, api_key: str) -> None:
-                self.api_key = api_key
+        self.assertEqual(result, "Via HTTP")
+        post = fake_requests.Session.return_value.post
+        self.assertEqual(post.call_args.args[0], ai_helper.RESPONSES_URL)
+        self.assertEqual(post.call_args.kwargs["headers"]["Authorization"], "Bearer dummy")
 
-            class responses:
-                @staticmethod
-                def create(*args, **kwargs):
-                    raise RuntimeError("boom")
+    def test_enhance_description_handles_exception(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
 
-        with mock.patch.object(ai_helper, "OpenAI", ExplodingClient):
+        with mock.patch.object(ai_helper, "OpenAI", FakeOpenAI(RuntimeError("boom"))):
             result = ai_helper.enhance_description("Raw title", "ABC-4")
 
         self.assertEqual(result, "Raw title")
 
-    def test_enhance_description_handles_empty_response(self) -> None:
+    def test_transient_errors_are_retried(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+
+        with mock.patch.object(ai_helper, "OpenAI", FakeOpenAI(Throttled("429"), "Eventually")), mock.patch.object(
+            ai_helper, "_TRANSIENT_OPENAI_ERRORS", (Throttled,)
+        ), mock.patch.object(ai_helper.time, "sleep") as sleep_mock:
+            result = ai_helper.enhance_description("Raw title", "ABC-9")
+
+        self.assertEqual(result, "Eventually")
+        sleep_mock.assert_called_once()
+
+    def test_rate_limiter_consulted_before_request(self) -> None:
         os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        limiter = mock.Mock()
+
+        with mock.patch.object(ai_helper, "OpenAI", FakeOpenAI("Limited")), mock.patch.object(
+            ai_helper, "_get_rate_limiter", return_value=limiter
+        ):
+            ai_helper.enhance_description("Raw title", "ABC-12")
+
+        limiter.acquire.assert_called_once()
+        self.assertGreater(limiter.acquire.call_args.args[0], 120)
 
-        class EmptyResponse:
-            output_text = ""
-            data = []
+    def test_non_transient_errors_are_not_retried(self) -> None:
+        fn = mock.Mock(side_effect=ValueError("bad request"))
+        with mock.patch.object(ai_helper.time, "sleep") as sleep_mock:
+            with self.assertRaises(ValueError):
+                ai_helper._with_retries(fn)
 
-        class EmptyClient:
-            def __init__(self, api_key: str) -> None:
-                self.api_key = api_key
+        fn.assert_called_once()
+        sleep_mock.assert_not_called()
 
-            class responses:
-                @staticmethod
-                def create(*args, **kwargs):
-                    return EmptyResponse()
+    def test_enhance_description_handles_empty_response(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
 
-        with mock.patch.object(ai_helper, "OpenAI", EmptyClient):
+        with mock.patch.object(ai_helper, "OpenAI", FakeOpenAI("")):
             result = ai_helper.enhance_description("Raw title", "ABC-5")
 
         self.assertEqual(result, "Raw title")
 
+    def test_suggest_categories_many_preserves_order_and_skips_empty(self) -> None:
+        with mock.patch.object(ai_helper, "suggest_category", side_effect=lambda context: context.upper()) as single:
+            results = ai_helper.suggest_categories_many(["fix", "", "feature"])
+        self.assertEqual(results, ["FIX", None, "FEATURE"])
+        self.assertEqual(single.call_count, 2)
+
+    def test_enrich_and_classify_many_sequential_when_single_worker(self) -> None:
+        with mock.patch.object(ai_helper, "ThreadPoolExecutor") as executor_mock, mock.patch.object(
+            ai_helper, "enrich_and_classify", return_value=("Only", None)
+        ):
+            results = ai_helper.enrich_and_classify_many([("Only", "A-1", "")])
+
+        executor_mock.assert_not_called()
+        self.assertEqual(results, [("Only", None)])
+
+    def test_enrich_and_classify_single_structured_call(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        fake_openai = FakeOpenAI('{"description": "Polished title", "category": "fix"}')
+
+        with mock.patch.object(ai_helper, "OpenAI", fake_openai):
+            result = ai_helper.enrich_and_classify("raw title", "ABC-7", "Labels: bug")
+
+        self.assertEqual(result, ("Polished title", "fix"))
+        self.assertEqual(len(fake_openai.calls), 1)
+        self.assertEqual(fake_openai.calls[0]["text"], ai_helper.ENTRY_FORMAT)
+        self.assertIn("Labels: bug", fake_openai.calls[0]["input"])
+
+    def test_enrich_and_classify_falls_back_on_invalid_payload(self) -> None:
+        self.assertEqual(ai_helper.enrich_and_classify("Title", "ABC-8"), ("Title", None))
+
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        with mock.patch.object(ai_helper, "_complete", return_value="not json"):
+            self.assertEqual(ai_helper.enrich_and_classify("Title", "ABC-8"), ("Title", None))
+        with mock.patch.object(ai_helper, "_complete", return_value='["list"]'):
+            self.assertEqual(ai_helper.enrich_and_classify("Title", "ABC-8"), ("Title", None))
+
+    def test_enrich_and_classify_batch_round_trip(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        client = mock.Mock()
+        client.files.create.return_value = mock.Mock(id="file-in")
+        client.batches.create.return_value = mock.Mock(id="batch-1", status="in_progress")
+        client.batches.retrieve.return_value = mock.Mock(id="batch-1", status="completed", output_file_id="file-out")
+        body = {"output": [{"content": [{"type": "output_text", "text": '{"description": "Nice", "category": "feature"}'}]}]}
+        client.files.content.return_value = mock.Mock(
+            text=json.dumps({"custom_id": "1", "response": {"status_code": 200, "body": body}}) + "\nnot json\n"
+        )
+
+        with mock.patch.object(ai_helper, "OpenAI", mock.Mock(return_value=client)), mock.patch.object(
+            ai_helper.time, "sleep"
+        ) as sleep_mock:
+            results = ai_helper.enrich_and_classify_batch(
+                [("First", "CHANGE-1", ""), ("Second", "CHANGE-2", "Commit title: feat: second")]
+            )
+
+        self.assertEqual(results, [("First", None), ("Nice", "feature")])
+        sleep_mock.assert_called_once()
+        self.assertEqual(client.batches.create.call_args.kwargs["endpoint"], "/v1/responses")
+        uploaded = client.files.create.call_args.kwargs["file"][1].decode("utf-8").splitlines()
+        self.assertEqual(len(uploaded), 2)
+
+    def test_enrich_and_classify_batch_failed_status_keeps_titles(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        client = mock.Mock()
+        client.batches.create.return_value = mock.Mock(id="batch-2", status="failed", output_file_id=None)
+
+        with mock.patch.object(ai_helper, "OpenAI", mock.Mock(return_value=client)):
+            results = ai_helper.enrich_and_classify_batch([("Title", "CHANGE-3", "")])
+
+        self.assertEqual(results, [("Title", None)])
+        client.files.content.assert_not_called()
+
+    def test_suggest_category_stops_stream_on_first_match(self) -> None:
+        os.environ["OPENAI_API_KEY"] = "dummy"
+        get_config.cache_clear()
+        fake_openai = FakeOpenAI(
+            AssertionError("non-streaming call"),
+            stream_deltas=["Fi", "x", " because", " reasons"],
+        )
+
+        with mock.patch.object(ai_helper, "OpenAI", fake_openai):
+            self.assertEqual(ai_helper.suggest_category("Commit title: fix crash"), "fix")
+
+        self.assertEqual(fake_openai.consumed, ["Fi", "x"])
+        self.assertEqual(fake_openai.calls, [])
+
+    def test_early_stop_completions_use_their_own_cache_key(self) -> None:
+        with mock.patch.object(ai_helper, "cached_call", side_effect=lambda key, fn: key):
+            full = ai_helper._complete("dummy", "prompt", max_output_tokens=10)
+            partial = ai_helper._complete(
+                "dummy", "prompt", max_output_tokens=10, stream_until=ai_helper._normalise_category
+            )
+
+        self.assertNotEqual(full, partial)
+        self.assertTrue(partial.startswith(full))
+
+    def test_stream_text_falls_back_to_final_response(self) -> None:
+        stream = mock.MagicMock()
+        stream.__enter__.return_value = stream
+        stream.__iter__.return_value = iter([mock.Mock(type="response.created")])
+        stream.get_final_response.return_value = FakeResponse("change")
+        client = mock.Mock()
+        client.responses.stream.return_value = stream
+
+        self.assertEqual(ai_helper._stream_text(client, "prompt", 10, ai_helper._normalise_category), "change")
+
+    def test_normalise_category_variants(self) -> None:
+        self.assertEqual(ai_helper._normalise_category(" Fix "), "fix")
+        self.assertEqual(ai_helper._normalise_category("hotfix"), "fix")
+        self.assertEqual(ai_helper._normalise_category("This is a new feature."), "feature")
+        self.assertEqual(ai_helper._normalise_category("looks like refactoring work"), "change")
+        self.assertEqual(ai_helper._normalise_category("category: feature"), "feature")
+        self.assertIsNone(ai_helper._normalise_category("unknown"))
+        self.assertIsNone(ai_helper._normalise_category(""))
+
     def test_first_text_extracts_from_structured_payload(self) -> None:
-        class Response:
-            output_text = ""
-            data = [
-                {
-                    "content": [
-                        {"type": "output_text", "text": "Structured response"},
-                    ]
-                }
-            ]
-
-        extracted = ai_helper._first_text(Response())
+        response = FakeResponse(data=[{"content": [{"type": "output_text", "text": "Structured response"}]}])
+
+        extracted = ai_helper._first_text(response)
         self.assertEqual(extracted, "Structured response")
 
     def test_first_text_none_path(self) -> None:
-        class Response:
-            output_text = ""
-            data = [{"content": []}]
-
-        self.assertIsNone(ai_helper._first_text(Response()))
+        self.assertIsNone(ai_helper._first_text(FakeResponse(data=[{"content": []}])))
 
     def test_first_text_skips_non_dict_items(self) -> None:
-        class Response:
-            output_text = ""
-            data = [None, {"content": [{"type": "output_text", "text": "Value"}]}]
+        response = FakeResponse(data=[None, {"content": [{"type": "output_text", "text": "Value"}]}])
 
-        extracted = ai_helper._first_text(Response())
+        extracted = ai_helper._first_text(response)
         self.assertEqual(extracted, "Value")
 
 
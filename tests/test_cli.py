@@ -1,4 +1,7 @@
 import argparse
+import ast
+import inspect
+import os
 import runpy
 import sys
 import unittest
@@ -18,6 +21,7 @@ class CLIModuleTests(unittest.TestCase):
             use_ai=False,
             forced_ticket="ABC-1",
             verbose=True,
+            batch=False,
         )
 
     def test_ai_flag_passthrough(self) -> None:
@@ -29,10 +33,17 @@ class CLIModuleTests(unittest.TestCase):
             use_ai=True,
             forced_ticket=None,
             verbose=False,
+            batch=False,
         )
 
+    def test_batch_flag_passthrough(self) -> None:
+        with patch("smart_changelog.cli.run_update") as run_update:
+            cli.main(["update", "--ai", "--batch"])
+
+        self.assertTrue(run_update.call_args.kwargs["batch"])
+
     def test_non_update_command_shows_help(self) -> None:
-        fake_args = argparse.Namespace(command="other", dry_run=False, verbose=False, ai=False, ticket=None)
+        fake_args = argparse.Namespace(command="other", dry_run=False, verbose=False, ai=False, ticket=None, batch=False)
         fake_parser = Mock()
         fake_parser.parse_args.return_value = fake_args
 
@@ -43,6 +54,17 @@ class CLIModuleTests(unittest.TestCase):
         self.assertEqual(result, 1)
 
     def test_module_entrypoint(self) -> None:
+        guard = ast.parse(inspect.getsource(cli)).body[-1]
+        self.assertIsInstance(guard, ast.If)
+        self.assertEqual(ast.unparse(guard.test), "__name__ == '__main__'")
+        self.assertEqual([ast.unparse(node) for node in guard.body], ["sys.exit(main())"])
+
+        with patch("smart_changelog.cli.run_update") as run_update:
+            self.assertEqual(cli.main(["update", "--dry-run"]), 0)
+        run_update.assert_called_once()
+
+    @unittest.skipUnless(os.environ.get("FULL_ENTRYPOINT_TEST") == "1", "re-imports the CLI; set FULL_ENTRYPOINT_TEST=1")
+    def test_module_entrypoint_runpy(self) -> None:
         argv_backup = sys.argv[:]
         sys.argv = ["smart-changelog", "update", "--dry-run"]
         try:
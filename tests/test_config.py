@@ -0,0 +1,34 @@
+import os
+import unittest
+from unittest import mock
+
+from smart_changelog import config
+
+
+class ConfigTests(unittest.TestCase):
+    def setUp(self) -> None:
+        config.get_config.cache_clear()
+        self.addCleanup(config.get_config.cache_clear)
+
+    def test_environment_read_once_until_cleared(self) -> None:
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": "first", "SMART_CHANGELOG_FAST_HTTP": "1"}, clear=True):
+            first = config.get_config()
+            os.environ["OPENAI_API_KEY"] = "second"
+            self.assertIs(config.get_config(), first)
+            self.assertEqual(first.openai_api_key, "first")
+            self.assertTrue(first.fast_http)
+
+            config.get_config.cache_clear()
+            self.assertEqual(config.get_config().openai_api_key, "second")
+
+    def test_empty_values_are_treated_as_unset(self) -> None:
+        with mock.patch.dict(os.environ, {"JIRA_URL": "", "JIRA_TOKEN": "token"}, clear=True):
+            settings = config.get_config()
+
+        self.assertIsNone(settings.jira_url)
+        self.assertEqual(settings.jira_token, "token")
+        self.assertFalse(settings.fast_http)
+
+
+if __name__ == "__main__":
+    unittest.main()
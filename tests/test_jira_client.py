@@ -1,39 +1,85 @@
+import json
 import os
 import unittest
+from typing import Optional
 from unittest import mock
 
 from smart_changelog import jira_client
+from smart_changelog.config import get_config
+
+
+class DummyHTTPError(Exception):
+    def __init__(self, response=None):
+        super().__init__("http error")
+        self.response = response
+
+
+class DummyRequestException(Exception):
+    pass
+
+
+class DummyRequests:
+    """Stands in for the ``requests`` module and, through ``Session``, for the shared session."""
+
+    HTTPError = DummyHTTPError
+    RequestException = DummyRequestException
+
+    def __init__(self) -> None:
+        self.headers: dict = {}
+        self.mount = mock.Mock()
+        self.get = mock.Mock()
+
+    def Session(self) -> "DummyRequests":
+        return self
+
+
+class FakeResponse:
+    def __init__(self, payload=None, status_code: int = 200, content: Optional[bytes] = None) -> None:
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode("utf-8") if content is None else content
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return json.loads(self.content)
 
 
 class JiraClientTests(unittest.TestCase):
     def setUp(self) -> None:
-        self._env_backup = os.environ.copy()
-
-    def tearDown(self) -> None:
-        os.environ.clear()
-        os.environ.update(self._env_backup)
+        env_patch = mock.patch.dict(os.environ)
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+        self.addCleanup(get_config.cache_clear)
+        jira_client._get_session.cache_clear()
+        jira_client._fetch_ticket.cache_clear()
+        self.addCleanup(jira_client._get_session.cache_clear)
+        self.addCleanup(jira_client._fetch_ticket.cache_clear)
 
     def test_missing_credentials_returns_ticket_id(self) -> None:
         os.environ.pop("JIRA_URL", None)
         os.environ.pop("JIRA_TOKEN", None)
+        get_config.cache_clear()
         result = jira_client.get_ticket_summary("ABC-123")
-        self.assertEqual(result["title"], "ABC-123")
-        self.assertEqual(result["labels"], [])
+        self.assertEqual(result.title, "ABC-123")
+        self.assertEqual(result.labels, ())
 
     def test_missing_credentials_with_url_returns_ticket_id(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ.pop("JIRA_TOKEN", None)
         os.environ.pop("JIRA_EMAIL", None)
         os.environ.pop("JIRA_API_TOKEN", None)
+        get_config.cache_clear()
         dummy = _dummy_requests(None)
         dummy.get = mock.Mock(side_effect=AssertionError("should not call"))
         with mock.patch.object(jira_client, "requests", dummy):
             result = jira_client.get_ticket_summary("ABC-126")
-        self.assertEqual(result["title"], "ABC-126")
+        self.assertEqual(result.title, "ABC-126")
 
     def test_requests_not_available(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_TOKEN"] = "token"
+        get_config.cache_clear()
         original = jira_client.requests
         try:
             jira_client.requests = None
@@ -41,25 +87,16 @@ class JiraClientTests(unittest.TestCase):
         finally:
             jira_client.requests = original
 
-        self.assertEqual(result["title"], "ABC-124")
-        self.assertEqual(result["labels"], [])
+        self.assertEqual(result.title, "ABC-124")
+        self.assertEqual(result.labels, ())
 
     def test_basic_auth_headers_used(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_EMAIL"] = "user@example.com"
         os.environ["JIRA_API_TOKEN"] = "apitoken"
         os.environ.pop("JIRA_TOKEN", None)
-
-        class FakeResponse:
-            status_code = 200
-
-            def raise_for_status(self):
-                return None
-
-            def json(self):
-                return {"fields": {"summary": "Summary"}}
-
-        dummy = _dummy_requests(FakeResponse())
+        get_config.cache_clear()
+        dummy = _dummy_requests(FakeResponse({"fields": {"summary": "Summary"}}))
 
         with mock.patch.object(jira_client, "requests", dummy):
             jira_client.get_ticket_summary("ABC-200")
@@ -72,17 +109,8 @@ class JiraClientTests(unittest.TestCase):
         os.environ["JIRA_TOKEN"] = "token"
         os.environ.pop("JIRA_EMAIL", None)
         os.environ.pop("JIRA_API_TOKEN", None)
-
-        class FakeResponse:
-            status_code = 200
-
-            def raise_for_status(self):
-                return None
-
-            def json(self):
-                return {"fields": {"summary": "Summary"}}
-
-        dummy = _dummy_requests(FakeResponse())
+        get_config.cache_clear()
+        dummy = _dummy_requests(FakeResponse({"fields": {"summary": "Summary"}}))
 
         with mock.patch.object(jira_client, "requests", dummy):
             jira_client.get_ticket_summary("ABC-201")
@@ -93,125 +121,155 @@ class JiraClientTests(unittest.TestCase):
     def test_successful_response(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_TOKEN"] = "token"
+        get_config.cache_clear()
+        payload = {
+            "fields": {
+                "summary": "Implement feature",
+                "status": {"name": "In Progress"},
+                "labels": ["backend", "high-priority"],
+            }
+        }
+        dummy = _dummy_requests(FakeResponse(payload))
 
-        class FakeResponse:
-            status_code = 200
-
-            def raise_for_status(self):
-                return None
-
-            def json(self):
-                return {
-                    "fields": {
-                        "summary": "Implement feature",
-                        "status": {"name": "In Progress"},
-                        "labels": ["backend", "high-priority"],
-                    }
-                }
+        with mock.patch.object(jira_client, "requests", dummy):
+            data = jira_client.get_ticket_summary("ABC-125")
 
-        dummy = _dummy_requests(FakeResponse())
+        self.assertEqual(data.title, "Implement feature")
+        self.assertEqual(data.status, "In Progress")
+        self.assertEqual(data.labels, ("backend", "high-priority"))
+        dummy.get.assert_called_once()
+        self.assertEqual(dummy.get.call_args.kwargs["params"], {"fields": "summary,status,labels"})
 
         with mock.patch.object(jira_client, "requests", dummy):
-            data = jira_client.get_ticket_summary("ABC-125")
+            again = jira_client.get_ticket_summary("ABC-125")
 
-        self.assertEqual(data["title"], "Implement feature")
-        self.assertEqual(data["status"], "In Progress")
-        self.assertEqual(data["labels"], ["backend", "high-priority"])
+        self.assertEqual(again, data)
+        self.assertEqual(data.as_dict()["labels"], ["backend", "high-priority"])
         dummy.get.assert_called_once()
 
+    def test_ticket_cache_is_keyed_by_credential_digest(self) -> None:
+        os.environ["JIRA_URL"] = "https://example.atlassian.net"
+        os.environ["JIRA_TOKEN"] = "first-secret"
+        get_config.cache_clear()
+        dummy = _dummy_requests(FakeResponse({"fields": {"summary": "Cached"}}))
+
+        with mock.patch.object(jira_client, "requests", dummy), mock.patch.object(
+            jira_client, "_fetch_ticket", wraps=jira_client._fetch_ticket
+        ) as fetch_mock:
+            jira_client.get_ticket_summary("ABC-130")
+            os.environ["JIRA_TOKEN"] = "second-secret"
+            get_config.cache_clear()
+            jira_client.get_ticket_summary("ABC-130")
+
+        self.assertEqual(dummy.get.call_count, 2)
+        self.assertEqual(dummy.get.call_args.kwargs["headers"]["Authorization"], "Bearer second-secret")
+        keys = [call.args for call in fetch_mock.call_args_list]
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertNotIn("secret", repr(keys))
+
     def test_ticket_not_found(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_TOKEN"] = "token"
-
-        class FakeResponse:
-            status_code = 404
-
-            def raise_for_status(self):
-                raise dummy.HTTPError(response=self)  # type: ignore[arg-type]
-
-        dummy = _dummy_requests(FakeResponse(), status_exception=True)
+        get_config.cache_clear()
+        dummy = _dummy_requests(FakeResponse(status_code=404), status_exception=True)
 
         with mock.patch.object(jira_client, "requests", dummy):
             data = jira_client.get_ticket_summary("ABC-404")
 
-        self.assertEqual(data["title"], "ABC-404")
-        self.assertEqual(data["labels"], [])
+        self.assertEqual(data.title, "ABC-404")
+        self.assertEqual(data.labels, ())
 
     def test_http_error_non_404(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_TOKEN"] = "token"
-
-        class FakeResponse:
-            status_code = 500
-
-            def raise_for_status(self):
-                raise dummy.HTTPError(response=self)  # type: ignore[arg-type]
-
-        dummy = _dummy_requests(FakeResponse(), status_exception=True)
+        get_config.cache_clear()
+        dummy = _dummy_requests(FakeResponse(status_code=500), status_exception=True)
 
         with mock.patch.object(jira_client, "requests", dummy):
             data = jira_client.get_ticket_summary("ABC-500")
 
-        self.assertEqual(data["title"], "ABC-500")
+        self.assertEqual(data.title, "ABC-500")
 
     def test_request_exception(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_TOKEN"] = "token"
+        get_config.cache_clear()
 
         dummy = _dummy_requests(None)
         dummy.get = mock.Mock(side_effect=dummy.RequestException("timeout"))
 
         with mock.patch.object(jira_client, "requests", dummy):
             result = jira_client.get_ticket_summary("ABC-500")
+            jira_client.get_ticket_summary("ABC-500")
 
-        self.assertEqual(result["title"], "ABC-500")
+        self.assertEqual(result.title, "ABC-500")
+        self.assertEqual(dummy.get.call_count, 2)
 
     def test_invalid_json(self) -> None:
         os.environ["JIRA_URL"] = "https://example.atlassian.net"
         os.environ["JIRA_TOKEN"] = "token"
+        get_config.cache_clear()
+        dummy = _dummy_requests(FakeResponse(content=b"{invalid"))
 
-        class FakeResponse:
-            status_code = 200
+        with mock.patch.object(jira_client, "requests", dummy):
+            result = jira_client.get_ticket_summary("ABC-JSON")
+
+        self.assertEqual(result.title, "ABC-JSON")
 
-            def raise_for_status(self):
-                return None
+    def test_decode_json_prefers_orjson(self) -> None:
+        fake_orjson = mock.Mock()
+        fake_orjson.loads.return_value = {"fields": {}}
+        response = mock.Mock(content=b'{"fields": {}}')
 
-            def json(self):
-                raise ValueError("invalid json")
+        with mock.patch.object(jira_client, "orjson", fake_orjson):
+            self.assertEqual(jira_client._decode_json(response), {"fields": {}})
 
-        dummy = _dummy_requests(FakeResponse())
+        fake_orjson.loads.assert_called_once_with(b'{"fields": {}}')
+        response.json.assert_not_called()
+
+        with mock.patch.object(jira_client, "orjson", None):
+            jira_client._decode_json(response)
+        response.json.assert_called_once()
+
+    def test_session_is_shared_between_lookups(self) -> None:
+        os.environ["JIRA_URL"] = "https://example.atlassian.net"
+        os.environ["JIRA_TOKEN"] = "token"
+        get_config.cache_clear()
+        dummy = _dummy_requests(None)
+        dummy.get = mock.Mock(side_effect=dummy.RequestException("offline"))
+        dummy.Session = mock.Mock(return_value=dummy)
 
         with mock.patch.object(jira_client, "requests", dummy):
-            result = jira_client.get_ticket_summary("ABC-JSON")
+            jira_client.get_ticket_summary("ABC-1")
+            jira_client.get_ticket_summary("ABC-2")
 
-        self.assertEqual(result["title"], "ABC-JSON")
+        dummy.Session.assert_called_once()
+        self.assertEqual(dummy.get.call_count, 2)
+        self.assertEqual(dummy.headers["Accept"], "application/json")
 
     def test_build_auth_headers_none(self) -> None:
         self.assertIsNone(jira_client._build_auth_headers(None, None, None))
 
+    def test_build_auth_headers_encodes_once_per_credentials(self) -> None:
+        jira_client._authorization_value.cache_clear()
+        with mock.patch.object(jira_client.base64, "b64encode", wraps=jira_client.base64.b64encode) as encode_mock:
+            first = jira_client._build_auth_headers(None, "user@example.com", "secret")
+            second = jira_client._build_auth_headers(None, "user@example.com", "secret")
 
-def _dummy_requests(response, status_exception: bool = False):
-    class DummyRequests:
-        class HTTPError(Exception):
-            def __init__(self, response=None):
-                super().__init__("http error")
-                self.response = response
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        encode_mock.assert_called_once()
 
-        class RequestException(Exception):
-            pass
 
+def _dummy_requests(response, status_exception: bool = False):
     dummy = DummyRequests()
     if response is not None:
-        dummy.get = mock.Mock(return_value=response)
+        dummy.get.return_value = response
         if status_exception:
-            def raise_error(self):
-                raise dummy.HTTPError(response=self)  # type: ignore[misc]
-
-            response.raise_for_status = raise_error.__get__(response, response.__class__)  # type: ignore[attr-defined]
-        else:
-            response.raise_for_status = lambda self=response: None  # type: ignore[assignment]
-    else:
-        dummy.get = mock.Mock()
+            def raise_error():
+                raise DummyHTTPError(response=response)
+
+            response.raise_for_status = raise_error  # type: ignore[assignment]
     return dummy
 
 
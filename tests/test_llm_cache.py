@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from smart_changelog import llm_cache
+
+
+class LLMCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        env_patch = mock.patch.dict(os.environ)
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        os.environ["XDG_CACHE_HOME"] = self.tmpdir.name
+        os.environ.pop("SMART_CHANGELOG_NO_CACHE", None)
+
+    def test_cache_path_honours_xdg(self) -> None:
+        path = llm_cache.cache_path()
+        self.assertTrue(str(path).startswith(self.tmpdir.name))
+        self.assertEqual(path.name, "llm.sqlite")
+
+    def test_second_call_is_served_from_cache(self) -> None:
+        fn = mock.Mock(return_value="value")
+        self.assertEqual(llm_cache.cached_call("model|prompt", fn), "value")
+        self.assertEqual(llm_cache.cached_call("model|prompt", fn), "value")
+        fn.assert_called_once()
+
+    def test_empty_results_are_not_stored(self) -> None:
+        fn = mock.Mock(return_value=None)
+        self.assertIsNone(llm_cache.cached_call("model|empty", fn))
+        self.assertIsNone(llm_cache.cached_call("model|empty", fn))
+        self.assertEqual(fn.call_count, 2)
+
+    def test_no_cache_env_bypasses_storage(self) -> None:
+        os.environ["SMART_CHANGELOG_NO_CACHE"] = "1"
+        fn = mock.Mock(return_value="value")
+        llm_cache.cached_call("model|bypass", fn)
+        llm_cache.cached_call("model|bypass", fn)
+        self.assertEqual(fn.call_count, 2)
+        self.assertFalse(llm_cache.cache_path().exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import unittest
+from unittest import mock
+
+from smart_changelog import rate_limit
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_requests_per_minute_blocks_when_exhausted(self) -> None:
+        clock = FakeClock()
+        limiter = rate_limit.RateLimiter(2, 0, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+        limiter.acquire()
+        self.assertEqual(len(clock.sleeps), 1)
+        self.assertAlmostEqual(clock.sleeps[0], 30.0)
+
+    def test_tokens_per_minute_waits_for_refill(self) -> None:
+        clock = FakeClock()
+        limiter = rate_limit.RateLimiter(0, 600, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire(500)
+        limiter.acquire(200)
+        self.assertAlmostEqual(sum(clock.sleeps), 10.0)
+
+        # Oversized requests wait for a full bucket rather than forever.
+        limiter.acquire(10_000)
+        self.assertAlmostEqual(clock.now, 70.0)
+
+    def test_limiter_from_env(self) -> None:
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(rate_limit.limiter_from_env())
+
+        with mock.patch.dict(os.environ, {"SMART_CHANGELOG_RPM": "60", "SMART_CHANGELOG_TPM": "oops"}, clear=True):
+            limiter = rate_limit.limiter_from_env()
+
+        self.assertIsNotNone(limiter)
+        self.assertEqual(limiter.requests_per_minute, 60)
+        self.assertEqual(limiter.tokens_per_minute, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
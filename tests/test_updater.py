@@ -1,47 +1,110 @@
-import io
 import os
 import subprocess
 import tempfile
 import unittest
-from datetime import datetime
+from contextlib import ExitStack, redirect_stdout
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, Optional
 from unittest import mock
 
 from smart_changelog import updater
+from smart_changelog.jira_client import JiraTicket
 
 
-class VersionHelperTests(unittest.TestCase):
+COMMIT = ("git", "commit", "-m", "chore: update changelog [skip ci]")
+DIFF_CACHED = ("git", "diff", "--cached", "--quiet", "--", "CHANGELOG.md")
+LS_FILES = ("git", "ls-files", "--error-unmatch", "--", "CHANGELOG.md")
+
+CHANGELOG_TITLE = "# Changelog\n"
+CHANGELOG_HEADER = CHANGELOG_TITLE + "\n"
+UNRELEASED_HEADER = "## [Unreleased]\n_Last updated: 2025-01-01_\n"
+BASE_CHANGELOG = (
+    CHANGELOG_HEADER + UNRELEASED_HEADER + "\n### 🧩 New Features\n\n### 🐛 Bug Fixes\n\n### ⚙️ Changes\n"
+)
+
+
+class FakeGit:
+    """Table-driven stand-in for ``subprocess.run`` that replies by the longest registered command prefix.
+
+    A reply is a return code, a ``(returncode, stderr)`` pair or an exception to raise; unregistered
+    commands succeed. As with ``subprocess.run``, ``check=True`` turns a non-zero code into an error.
+    """
+
+    def __init__(self, replies=None) -> None:
+        self.replies = replies or {}
+        self.calls: list[list[str]] = []
+
+    def __call__(self, cmd, check=False, **kwargs):
+        self.calls.append(cmd)
+        for length in range(len(cmd), 0, -1):
+            reply = self.replies.get(tuple(cmd[:length]))
+            if reply is not None:
+                break
+        else:
+            reply = 0
+        if isinstance(reply, Exception):
+            raise reply
+        returncode, stderr = reply if isinstance(reply, tuple) else (reply, "")
+        if check and returncode:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        return subprocess.CompletedProcess(cmd, returncode, stdout="", stderr=stderr)
+
+
+class OutputSink:
+    """Write-only stdout replacement that collects chunks and joins them once on ``getvalue``."""
+
+    def __init__(self) -> None:
+        self.chunks: list[str] = []
+
+    def write(self, text: str) -> int:
+        self.chunks.append(text)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def getvalue(self) -> str:
+        return "".join(self.chunks)
+
+
+def _head_log(short_sha: str, subject: str, author: str = "Git User", refs: str = "HEAD -> main") -> str:
+    return "\x1f".join([short_sha, subject, author, refs, f"{subject}\n\nBody"])
+
+
+class TempRootTestCase(unittest.TestCase):
+    """Creates one temporary root per class; each test gets a fresh ``self.base`` subdirectory in it.
+
+    The subdirectory is only created on first access, so tests that never touch disk skip it.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._root = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._root.cleanup()
+
     def setUp(self) -> None:
-        self.tmpdir = tempfile.TemporaryDirectory()
-        self.addCleanup(self.tmpdir.cleanup)
-        self.original_cwd = Path.cwd()
-        os.chdir(self.tmpdir.name)
+        updater._manifest_version.cache_clear()
+        self._base: Optional[Path] = None
 
-    def tearDown(self) -> None:
-        os.chdir(self.original_cwd)
+    @property
+    def base(self) -> Path:
+        if self._base is None:
+            self._base = Path(tempfile.mkdtemp(dir=self._root.name))
+        return self._base
 
-    def test_update_context_render_uses_template(self) -> None:
-        original_template = updater.Template
 
-        class DummyTemplate:
-            def __init__(self, fmt: str) -> None:
-                self.fmt = fmt
+class VersionHelperTests(TempRootTestCase):
 
-            def render(self, **kwargs) -> str:  # pragma: no cover - deterministic stub
-                return "rendered"
+    def test_update_context_render_entry(self) -> None:
+        ctx = updater.UpdateContext(ticket_id="ABC-1", category="fix", title=" Title ", author="", date="2025-01-01")
+        self.assertEqual(ctx.render_entry(), "- Title (ABC-1, Unknown, 2025-01-01)")
 
-        try:
-            updater.Template = DummyTemplate  # type: ignore[assignment]
-            ctx = updater.UpdateContext(
-                ticket_id="ABC-1",
-                category="feature",
-                title="Title",
-                author="Author",
-                date="2025-01-01",
-            )
-            self.assertEqual(ctx.render_entry(), "rendered")
-        finally:
-            updater.Template = original_template
+        ctx.author = " Author "
+        self.assertEqual(ctx.render_entry(), "- Title (ABC-1, Author, 2025-01-01)")
 
     def test_render_version_block_includes_markers(self) -> None:
         block = updater._render_version_block("1.5", "2025-02-02", {"feature": ["- Entry A"]})
@@ -59,22 +122,127 @@ class VersionHelperTests(unittest.TestCase):
         if updater.Template is None:  # pragma: no cover - depends on optional dependency
             self.skipTest("jinja2 not installed")
 
-        template_path = Path(self.tmpdir.name) / "custom.j2"
+        template_path = self.base / "custom.j2"
         template_path.write_text(
             "{{ version }}|{{ date }}|"
             "{% for section in sections %}{{ section.key }}={{ section.entries|length }};{% endfor %}",
             encoding="utf-8",
         )
 
-        os.environ["SMART_CHANGELOG_TEMPLATE"] = str(template_path)
-        try:
+        with mock.patch.dict(os.environ, {"SMART_CHANGELOG_TEMPLATE": str(template_path)}):
             block = updater._render_version_block("9.9", "2025-03-03", {"feature": ["- Alpha"]})
-        finally:
-            os.environ.pop("SMART_CHANGELOG_TEMPLATE", None)
 
         self.assertIn("9.9|2025-03-03", block)
         self.assertIn("feature=1", block)
 
+    def test_templates_receive_sections_as_dicts(self) -> None:
+        template = mock.Mock()
+        template.render.return_value = "rendered"
+        with mock.patch.object(updater, "Template", return_value=template), mock.patch.object(
+            updater, "_version_template", return_value=template
+        ), mock.patch.dict(os.environ, {"SMART_CHANGELOG_TEMPLATE": "custom.j2"}):
+            updater._render_version_block("1.0", "2025-01-01", {"fix": ["- Patch"]})
+
+        sections = template.render.call_args.kwargs["sections"]
+        self.assertEqual(
+            sections[1],
+            {
+                "key": "fix",
+                "heading": "🐛 Bug Fixes",
+                "start_marker": "<!-- section:fix -->",
+                "end_marker": "<!-- /section:fix -->",
+                "entries": ["- Patch"],
+            },
+        )
+        self.assertEqual(sections[0]["entries"], [])
+
+    def test_render_version_block_fallback_layout(self) -> None:
+        sections = [
+            updater._SectionDefinition("a", "A", "<!-- a -->", "<!-- /a -->", ("- one", "- two")),
+            updater._SectionDefinition("b", "B", "<!-- b -->", "<!-- /b -->"),
+        ]
+        rendered = updater._render_version_block_fallback("1.0", "2025-01-01", sections)
+        self.assertEqual(
+            rendered,
+            "## 1.0\n_Last updated: 2025-01-01_\n\n<!-- a -->\n### A\n\n- one\n- two\n\n<!-- /a -->\n\n"
+            "<!-- b -->\n<!-- /b -->\n",
+        )
+
+    def test_parse_version_block_mixes_marked_and_legacy_sections(self) -> None:
+        block = (
+            "## 1.0\n_Last updated: 2025-01-01_\n\n"
+            "<!-- section:fix -->\n### 🐛 Bug Fixes\n\n- fixed\n\n<!-- /section:fix -->\n\n"
+            "### ⚙️ Changes\n\n- legacy change\n"
+        )
+        parsed = updater._parse_version_block(block)
+        self.assertEqual(list(parsed["sections"]), ["feature", "fix", "change"])
+        self.assertEqual(parsed["sections"]["fix"], ["- fixed"])
+        self.assertEqual(parsed["sections"]["change"], ["- legacy change"])
+        self.assertEqual(parsed["sections"]["feature"], [])
+
+    def test_version_template_compiled_once_per_source(self) -> None:
+        compiled = []
+
+        class FakeTemplate:
+            def __init__(self, text: str) -> None:
+                compiled.append(text)
+                self.text = text
+
+            def render(self, **kwargs) -> str:
+                return f"{self.text}|{kwargs['version']}"
+
+        updater._compile_version_template.cache_clear()
+        self.addCleanup(updater._compile_version_template.cache_clear)
+        template_path = self.base / "custom.j2"
+        template_path.write_text("custom", encoding="utf-8")
+
+        with mock.patch.object(updater, "Template", FakeTemplate):
+            updater._render_version_block("1.0", "2025-01-01")
+            updater._render_version_block("1.1", "2025-01-01")
+            with mock.patch.dict(os.environ, {"SMART_CHANGELOG_TEMPLATE": str(template_path)}):
+                block = updater._render_version_block("2.0", "2025-01-01")
+                updater._render_version_block("2.1", "2025-01-01")
+
+        self.assertEqual(compiled, ["custom"])
+        self.assertEqual(block, "custom|2.0\n")
+
+    def test_packaged_version_template_is_pinned(self) -> None:
+        # _render_default_version_block mirrors this template; update both together.
+        self.assertEqual(
+            updater._read_template_text("version_block.md.j2"),
+            "## {{ version }}\n_Last updated: {{ date }}_\n\n{% for section in sections %}\n"
+            "{{ section.start_marker }}\n{% if section.entries %}### {{ section.heading }}\n\n"
+            "{% for entry in section.entries %}\n{{ entry }}\n{% endfor %}\n\n{% endif %}\n"
+            "{{ section.end_marker }}\n\n{% endfor %}\n",
+        )
+
+    def test_default_version_block_layout(self) -> None:
+        with mock.patch.object(updater, "Template") as template_mock:
+            block = updater._render_version_block("1.0", "2025-01-01", {"change": ["- One", "- Two"]})
+        template_mock.assert_not_called()
+        self.assertEqual(
+            block,
+            "## 1.0\n_Last updated: 2025-01-01_\n\n\n"
+            "<!-- section:feature -->\n\n<!-- /section:feature -->\n\n\n"
+            "<!-- section:fix -->\n\n<!-- /section:fix -->\n\n\n"
+            "<!-- section:change -->\n### ⚙️ Changes\n\n\n- One\n\n- Two\n\n\n\n<!-- /section:change -->\n",
+        )
+
+    def test_default_version_block_matches_packaged_template(self) -> None:
+        if updater.Template is None:  # pragma: no cover - depends on optional dependency
+            self.skipTest("jinja2 not installed")
+
+        template = updater.Template(updater._read_template_text("version_block.md.j2"))
+        for entries in ({}, {"feature": ["- A"], "change": ["- B", "- C"]}):
+            sections = [
+                definition.with_entries(entries.get(definition.key, ())) for definition in updater._SECTION_DEFINITIONS
+            ]
+            rendered = template.render(version="3.1", date="2025-07-07", sections=sections)
+            self.assertEqual(
+                updater._normalise_block(updater._render_default_version_block("3.1", "2025-07-07", sections)),
+                updater._normalise_block(rendered),
+            )
+
     def test_parse_version_block_roundtrip(self) -> None:
         block = updater._render_version_block(
             "2.0",
@@ -106,7 +274,7 @@ class VersionHelperTests(unittest.TestCase):
 
     def test_replace_version_block_detects_changes(self) -> None:
         base_block = updater._render_version_block("1.0", "2025-01-01")
-        content = "# Changelog\n\n" + base_block + "## 0.9\n_Last updated: 2024-12-12_\n"
+        content = CHANGELOG_HEADER + base_block + "## 0.9\n_Last updated: 2024-12-12_\n"
 
         unchanged, changed = updater._replace_version_block(content, "## 1.0", base_block)
         self.assertFalse(changed)
@@ -118,17 +286,27 @@ class VersionHelperTests(unittest.TestCase):
         self.assertIn("- New entry", updated)
 
     def test_current_version_from_manifest(self) -> None:
-        Path("manifest.yaml").write_text(
+        (self.base / "manifest.yaml").write_text(
             """version:\n  major: 2\n  minor: 7\n  patch: ${CI_PIPELINE_IID}\n  prerelease: rc1\n""",
             encoding="utf-8",
         )
-        self.assertEqual(updater._current_version(), "2.7-rc1")
+        self.assertEqual(updater._current_version(self.base / "manifest.yaml"), "2.7-rc1")
+
+    def test_current_version_is_memoised_until_manifest_changes(self) -> None:
+        path = self.base / "manifest.yaml"
+        path.write_text("version:\n  major: 1\n  minor: 0\n", encoding="utf-8")
+        self.assertEqual(updater._current_version(path), "1.0")
+        with mock.patch.object(Path, "read_text", side_effect=AssertionError("re-read")):
+            self.assertEqual(updater._current_version(path), "1.0")
+
+        path.write_text("version:\n  major: 1\n  minor: 10\n", encoding="utf-8")
+        self.assertEqual(updater._current_version(path), "1.10")
 
     def test_current_version_missing_manifest(self) -> None:
-        self.assertEqual(updater._current_version(), "0.0")
+        self.assertEqual(updater._current_version(self.base / "manifest.yaml"), "0.0")
 
     def test_ensure_version_block_creates_new(self) -> None:
-        content = "# Changelog\n"
+        content = CHANGELOG_TITLE
         updated, created = updater._ensure_version_block(content, "## 1.5", "2025-02-02")
         self.assertTrue(created)
         self.assertIn("## 1.5", updated)
@@ -136,22 +314,31 @@ class VersionHelperTests(unittest.TestCase):
         self.assertIn("<!-- section:feature -->", updated)
 
     def test_ensure_version_block_replaces_unreleased(self) -> None:
-        content = (
-            "# Changelog\n\n"
-            "## [Unreleased]\n_Last updated: 2025-01-01_\n\n"
-            "### 🧩 New Features\n\n"
-            "### 🐛 Bug Fixes\n\n"
-            "### ⚙️ Changes\n"
-        )
-        updated, created = updater._ensure_version_block(content, "## 3.0", "2025-03-03")
+        updated, created = updater._ensure_version_block(BASE_CHANGELOG, "## 3.0", "2025-03-03")
         self.assertTrue(created)
         self.assertIn("## 3.0", updated)
         self.assertNotIn("Unreleased", updated)
         self.assertIn("<!-- section:change -->", updated)
 
+    def test_ensure_version_block_replaces_only_unreleased_section(self) -> None:
+        content = "# Changelog\n\n## [Unreleased]\n- pending\n\n## 1.0\n- shipped\n"
+        updated, created = updater._ensure_version_block(content, "## 2.0", "2025-03-03")
+        self.assertTrue(created)
+        self.assertTrue(updated.startswith("# Changelog\n\n## 2.0\n"))
+        self.assertNotIn("pending", updated)
+        self.assertTrue(updated.endswith("\n## 1.0\n- shipped\n"))
+
+    def test_find_version_block_returns_span_up_to_next_version(self) -> None:
+        content = "# Changelog\n\n## 2.0\n_Last updated: 2025-02-02_\n\n## 1.0\nold\n"
+        start, end = updater._find_version_block(content, "## 2.0")
+        self.assertEqual(content[start:end], "## 2.0\n_Last updated: 2025-02-02_\n")
+        start, end = updater._find_version_block(content, "## 1.0")
+        self.assertEqual(content[start:end], "## 1.0\nold\n")
+        self.assertIsNone(updater._find_version_block(content, "## 1"))
+
     def test_upsert_entry_for_version_inserts_and_updates(self) -> None:
         block = updater._render_version_block("1.0", "2025-01-01")
-        content = "# Changelog\n\n" + block
+        content = CHANGELOG_HEADER + block
 
         updated, changed = updater._upsert_entry_for_version(
             content,
@@ -175,9 +362,66 @@ class VersionHelperTests(unittest.TestCase):
         self.assertIn("- First entry updated (CHANGE-1, Alice, 2025-01-03)", updated_again)
         self.assertNotIn("- First entry (CHANGE-1, Alice, 2025-01-02)", updated_again)
 
+    def test_upsert_entry_replaces_hand_edited_entry(self) -> None:
+        block = updater._render_version_block(
+            "1.0",
+            "2025-01-01",
+            {"fix": ["- Crash on start (ABC-12, Bob, 2025-01-01)", "- Fix login (ABC-1, Alice (QA), 2025-01-01) see #42"]},
+        )
+        content = CHANGELOG_HEADER + block
+
+        updated, changed = updater._upsert_entry_for_version(
+            content, "## 1.0", "### 🐛 Bug Fixes", "- Fix login (ABC-1, Alice, 2025-01-02)", "ABC-1"
+        )
+
+        self.assertTrue(changed)
+        parsed = updater._parse_version_block(updated[len(CHANGELOG_HEADER) :])
+        self.assertEqual(
+            parsed["sections"]["fix"],
+            ["- Crash on start (ABC-12, Bob, 2025-01-01)", "- Fix login (ABC-1, Alice, 2025-01-02)"],
+        )
+
+    def test_upsert_entries_for_version_applies_all_entries(self) -> None:
+        content = CHANGELOG_HEADER + updater._render_version_block("1.0", "2025-01-01")
+        entries = [
+            ("### ⚙️ Changes", "- First (CHANGE-1, Alice, 2025-01-02)", "CHANGE-1"),
+            ("### 🐛 Bug Fixes", "- Second (CHANGE-2, Bob, 2025-01-02)", "CHANGE-2"),
+            ("### ⚙️ Changes", "- First again (CHANGE-1, Alice, 2025-01-03)", "CHANGE-1"),
+        ]
+        with mock.patch.object(updater, "_render_version_block", wraps=updater._render_version_block) as render:
+            updated, changed = updater._upsert_entries_for_version(content, "## 1.0", entries)
+
+        self.assertTrue(changed)
+        render.assert_called_once()
+        self.assertIn("- First again (CHANGE-1, Alice, 2025-01-03)", updated)
+        self.assertNotIn("- First (CHANGE-1", updated)
+        self.assertIn("- Second (CHANGE-2, Bob, 2025-01-02)", updated)
+
+    def test_upsert_entries_match_whole_ticket_ids(self) -> None:
+        content = CHANGELOG_HEADER + updater._render_version_block(
+            "1.0", "2025-01-01", {"change": ["- Older (CHANGE-12, Bob, 2025-01-01)"]}
+        )
+        entries = [
+            ("### ⚙️ Changes", "- New (CHANGE-1, Alice, 2025-01-02)", "CHANGE-1"),
+            ("### ⚙️ Changes", "- Newer (CHANGE-2, Alice, 2025-01-02)", "CHANGE-2"),
+            ("### ⚙️ Changes", "- Older again (CHANGE-12, Bob, 2025-01-03)", "CHANGE-12"),
+            ("### ⚙️ Changes", "- New again (CHANGE-1, Alice, 2025-01-03)", "CHANGE-1"),
+        ]
+        updated, changed = updater._upsert_entries_for_version(content, "## 1.0", entries)
+
+        self.assertTrue(changed)
+        self.assertEqual(
+            updater._parse_version_block(updated[updated.index("## 1.0") :])["sections"]["change"],
+            [
+                "- Newer (CHANGE-2, Alice, 2025-01-02)",
+                "- New again (CHANGE-1, Alice, 2025-01-03)",
+                "- Older again (CHANGE-12, Bob, 2025-01-03)",
+            ],
+        )
+
     def test_upsert_entry_adds_missing_section(self) -> None:
         block = updater._render_version_block("2.0", "2025-05-01")
-        content = "# Changelog\n\n" + block
+        content = CHANGELOG_HEADER + block
         updated, changed = updater._upsert_entry_for_version(
             content,
             "## 2.0",
@@ -189,93 +433,141 @@ class VersionHelperTests(unittest.TestCase):
         self.assertIn("### 🐛 Bug Fixes", updated)
         self.assertIn("- Fix bug (BUG-1, Bob, 2025-05-02)", updated)
 
-    def test_update_last_updated(self) -> None:
-        block = updater._render_version_block("1.2", "2025-01-01", {"change": ["- Item"]})
-        content = "# Changelog\n\n" + block
-        updated, changed = updater._update_last_updated(content, "## 1.2", "2025-04-04")
-        self.assertTrue(changed)
-        self.assertIn("_Last updated: 2025-04-04_", updated)
+    def test_update_version_block_applies_entries_and_date_in_one_pass(self) -> None:
+        content = CHANGELOG_HEADER + updater._render_version_block("1.0", "2025-01-01") + "\n## 0.9\n- old\n"
+        entries = [("### 🐛 Bug Fixes", "- Fixed (CHANGE-9, Eve, 2025-02-02)", "CHANGE-9")]
 
-    def test_update_last_updated_inserts_when_missing(self) -> None:
-        block = updater._render_version_block("3.0", "2025-06-01")
-        block_without_date = block.replace("_Last updated: 2025-06-01_\n", "", 1)
-        content = "# Changelog\n\n" + block_without_date
+        with mock.patch.object(updater, "_find_version_block", wraps=updater._find_version_block) as find_mock:
+            updated, changed = updater._update_version_block(content, "## 1.0", entries, "2025-02-02")
 
-        updated, changed = updater._update_last_updated(content, "## 3.0", "2025-06-06")
         self.assertTrue(changed)
-        self.assertIn("_Last updated: 2025-06-06_", updated)
+        find_mock.assert_called_once()
+        self.assertIn("_Last updated: 2025-02-02_", updated)
+        self.assertIn("- Fixed (CHANGE-9, Eve, 2025-02-02)", updated)
+        self.assertTrue(updated.endswith("\n## 0.9\n- old\n"))
+
+        again, changed_again = updater._update_version_block(updated, "## 1.0", entries, "2025-02-02")
+        self.assertFalse(changed_again)
+        self.assertEqual(again, updated)
+
+    def test_update_last_updated(self) -> None:
+        sections = {"change": ["- Item"]}
+        stale = updater._render_version_block("1.2", "2025-01-01", sections)
+        undated = stale.replace("_Last updated: 2025-01-01_\n", "", 1)
+        fresh = CHANGELOG_HEADER + updater._render_version_block("1.2", "2025-04-04", sections)
+        cases = [
+            ("stale stamp", CHANGELOG_HEADER + stale, fresh),
+            ("missing stamp", CHANGELOG_HEADER + undated, fresh),
+            (
+                "malformed stamp",
+                "# Changelog\n\n## 1.2\n_Last updated: soon_\n\n- Item\n## 0.9\n",
+                "# Changelog\n\n## 1.2\n_Last updated: 2025-04-04_\n\n- Item\n## 0.9\n",
+            ),
+        ]
+        for name, content, expected in cases:
+            with self.subTest(name):
+                updated, changed = updater._update_last_updated(content, "## 1.2", "2025-04-04")
+                self.assertTrue(changed)
+                self.assertEqual(updated, expected)
+
+                unchanged, changed_again = updater._update_last_updated(updated, "## 1.2", "2025-04-04")
+                self.assertFalse(changed_again)
+                self.assertIs(unchanged, updated)
 
 
-class RunUpdateIntegrationTests(unittest.TestCase):
+class RunUpdateIntegrationTests(TempRootTestCase):
     def setUp(self) -> None:
-        self.tmpdir = tempfile.TemporaryDirectory()
-        self.addCleanup(self.tmpdir.cleanup)
-        self.original_cwd = Path.cwd()
-        os.chdir(self.tmpdir.name)
-        Path("manifest.yaml").write_text(
+        super().setUp()
+        self.changelog = self.base / "CHANGELOG.md"
+        (self.base / "manifest.yaml").write_text(
             """version:\n  major: 1\n  minor: 5\n  patch: ${CI_PIPELINE_IID}\n  prerelease: ""\n""",
             encoding="utf-8",
         )
-        Path("CHANGELOG.md").write_text("# Changelog\n", encoding="utf-8")
-        os.environ["CI_COMMIT_AUTHOR"] = "Alice"
-
-    def tearDown(self) -> None:
-        os.chdir(self.original_cwd)
-        os.environ.pop("CI_COMMIT_AUTHOR", None)
+        self.changelog.write_text(CHANGELOG_TITLE, encoding="utf-8")
+        self.stack = ExitStack()
+        self.addCleanup(self.stack.close)
+        self.stack.enter_context(mock.patch.dict(os.environ, {"CI_COMMIT_AUTHOR": "Alice"}))
+
+    def _patch(self, name: str, **kwargs) -> mock.MagicMock:
+        """Patch ``updater.<name>`` until the end of the test and return the mock."""
+        return self.stack.enter_context(mock.patch.object(updater, name, **kwargs))
+
+    def _patch_many(self, **settings: Dict[str, Any]) -> Dict[str, mock.MagicMock]:
+        """Patch several ``updater`` attributes through one ``patch.multiple``, configuring each mock.
+
+        Keywords map attribute names to ``configure_mock`` arguments; the mocks are returned by name.
+        """
+        mocks = self.stack.enter_context(mock.patch.multiple(updater, **dict.fromkeys(settings, mock.DEFAULT)))
+        for name, config in settings.items():
+            mocks[name].configure_mock(**config)
+        return mocks
+
+    def _patch_git(self, short_sha: str, subject: str) -> None:
+        """Answer ``git log`` with a HEAD record for ``short_sha``; other git calls get a placeholder."""
+        replies = {"log": _head_log(short_sha, subject)}
+        self._patch("_git_output", side_effect=lambda cmd: replies.get(cmd[1], "placeholder"))
+
+    def _run_update(self, *, dry_run: bool = False, use_ai: bool = False, forced_ticket=None, verbose: bool = False) -> None:
+        updater.run_update(
+            dry_run=dry_run, use_ai=use_ai, forced_ticket=forced_ticket, verbose=verbose, base_path=self.base
+        )
 
-    def test_run_update_with_jira_ticket(self) -> None:
-        def fake_git_output(cmd):
-            joined = " ".join(cmd)
-            if "--pretty=%s" in joined:
-                return "feat: add endpoint"
-            if "rev-parse" in joined:
-                return "abcdef1"
-            return "placeholder"
+    def test_run_update_writes_ticket_entry(self) -> None:
+        cases = [
+            (
+                "jira ticket",
+                {"detected": "FOK-123", "title": "Implement endpoint"},
+                ["## 1.5", "- Implement endpoint (FOK-123, Alice"],
+            ),
+            (
+                "ai enrichment",
+                {"detected": "FOK-999", "title": "Initial", "use_ai": True},
+                ["AI:Initial", "### 🧩 New Features"],
+            ),
+            ("forced ticket", {"forced_ticket": "FOK-42", "title": "Forced"}, ["- Forced (FOK-42, Alice"]),
+        ]
+        for name, case, expected in cases:
+            # Each case gets a fresh changelog and its own patches, released when the case ends.
+            with self.subTest(name), ExitStack() as self.stack:
+                self.changelog.write_text(CHANGELOG_TITLE, encoding="utf-8")
+                mocks = self._patch_many(
+                    _gather_context_strings={"return_value": []},
+                    get_ticket_summary={"return_value": JiraTicket(title=case["title"])},
+                    enrich_and_classify={"side_effect": lambda title, *_: (f"AI:{title}", "feature")},
+                    suggest_category={"return_value": "fix"},
+                    _maybe_commit_and_push={},
+                )
+                if "detected" in case:
+                    self._patch("_detect_ticket_id", return_value=case["detected"])
+                self._patch_git("abcdef1", "feat: add endpoint")
+
+                self._run_update(use_ai=case.get("use_ai", False), forced_ticket=case.get("forced_ticket"))
+
+                mocks["_maybe_commit_and_push"].assert_called_once()
+                mocks["suggest_category"].assert_not_called()
+                self.assertEqual(mocks["enrich_and_classify"].called, case.get("use_ai", False))
+                if "forced_ticket" in case:
+                    mocks["_gather_context_strings"].assert_not_called()
+                    mocks["get_ticket_summary"].assert_called_once_with(case["forced_ticket"])
+                content = self.changelog.read_bytes()
+                for text in expected:
+                    self.assertIn(text.encode("utf-8"), content)
+
+    def test_run_update_second_identical_run_leaves_changelog_alone(self) -> None:
+        mocks = self._patch_many(
+            _gather_context_strings={"return_value": []},
+            _detect_ticket_id={"return_value": "FOK-123"},
+            get_ticket_summary={"return_value": JiraTicket(title="Implement endpoint")},
+            _maybe_commit_and_push={},
+            _git_output={"return_value": _head_log("abcdef1", "feat: add endpoint")},
+        )
 
-        with mock.patch.object(updater, "_gather_context_strings", return_value=[]), mock.patch.object(
-            updater, "_detect_ticket_id", return_value="FOK-123"
-        ), mock.patch.object(
-            updater, "get_ticket_summary", return_value={"title": "Implement endpoint"}
-        ), mock.patch.object(
-            updater, "_maybe_commit_and_push"
-        ) as commit_mock, mock.patch.object(
-            updater, "_git_output", side_effect=fake_git_output
-        ):
-            updater.run_update(dry_run=False, use_ai=False, forced_ticket=None, verbose=False)
-
-        commit_mock.assert_called_once()
-        content = Path("CHANGELOG.md").read_text(encoding="utf-8")
-        self.assertIn("## 1.5", content)
-        self.assertIn("- Implement endpoint (FOK-123, Alice", content)
-
-    def test_run_update_with_ai_enrichment_enabled(self) -> None:
-        def fake_git_output(cmd):
-            joined = " ".join(cmd)
-            if "--pretty=%s" in joined:
-                return "feat: add ai"
-            if "rev-parse" in joined:
-                return "ai12345"
-            return "placeholder"
-
-        with mock.patch.object(updater, "_gather_context_strings", return_value=[]), mock.patch.object(
-            updater, "_detect_ticket_id", return_value="FOK-999"
-        ), mock.patch.object(
-            updater, "get_ticket_summary", return_value={"title": "Initial"}
-        ), mock.patch.object(
-            updater, "enhance_description", side_effect=lambda title, _: f"AI:{title}"
-        ) as enhance_mock, mock.patch.object(
-            updater, "suggest_category", return_value="feature"
-        ) as category_mock, mock.patch.object(
-            updater, "_maybe_commit_and_push"
-        ), mock.patch.object(
-            updater, "_git_output", side_effect=fake_git_output
-        ):
-            updater.run_update(dry_run=False, use_ai=True, forced_ticket=None, verbose=False)
+        self._run_update()
+        write_mock = self._patch("_write_changelog")
+        self._run_update()
 
-        enhance_mock.assert_called()
-        category_mock.assert_called()
-        content = Path("CHANGELOG.md").read_text(encoding="utf-8")
-        self.assertIn("AI:Initial", content)
+        write_mock.assert_not_called()
+        mocks["_maybe_commit_and_push"].assert_called_once()
 
     def test_run_update_without_ticket_uses_commit_history(self) -> None:
         context = updater.UpdateContext(
@@ -285,127 +577,119 @@ class RunUpdateIntegrationTests(unittest.TestCase):
             author="Bob",
             date="2025-02-02",
         )
+        mocks = self._patch_many(
+            _gather_context_strings={"return_value": []},
+            _detect_ticket_id={"return_value": None},
+            _contexts_from_commit_history={"return_value": [context]},
+            _maybe_commit_and_push={},
+        )
+        self._patch_git("abc1234", "chore: update docs")
 
-        def fake_git_output(cmd):
-            joined = " ".join(cmd)
-            if "--pretty=%s" in joined:
-                return "chore: update docs"
-            if "rev-parse" in joined:
-                return "abc1234"
-            return "placeholder"
+        self._run_update()
 
-        with mock.patch.object(updater, "_gather_context_strings", return_value=[]), mock.patch.object(
-            updater, "_detect_ticket_id", return_value=None
-        ), mock.patch.object(
-            updater, "_contexts_from_commit_history", return_value=[context]
-        ), mock.patch.object(
-            updater, "_maybe_commit_and_push"
-        ) as commit_mock, mock.patch.object(
-            updater, "_git_output", side_effect=fake_git_output
-        ):
-            updater.run_update(dry_run=False, use_ai=False, forced_ticket=None, verbose=False)
-
-        commit_mock.assert_called_once()
-        content = Path("CHANGELOG.md").read_text(encoding="utf-8")
-        self.assertIn("CHANGE-abc123", content)
-        self.assertIn("Update docs", content)
+        mocks["_maybe_commit_and_push"].assert_called_once()
+        content = self.changelog.read_bytes()
+        self.assertIn(b"CHANGE-abc123", content)
+        self.assertIn(b"Update docs", content)
 
     def test_run_update_without_ticket_creates_fallback_when_history_empty(self) -> None:
-        def fake_git_output(cmd):
-            joined = " ".join(cmd)
-            if "--pretty=%s" in joined:
-                return "fix: address issue"
-            if "rev-parse" in joined:
-                return "fedcba1"
-            return "placeholder"
-
-        with mock.patch.object(updater, "_gather_context_strings", return_value=[]), mock.patch.object(
-            updater, "_detect_ticket_id", return_value=None
-        ), mock.patch.object(
-            updater, "_contexts_from_commit_history", return_value=[]
-        ), mock.patch.object(
-            updater, "enhance_description", side_effect=lambda title, _: f"AI:{title}"
-        ) as enhance_mock, mock.patch.object(
-            updater, "suggest_category", return_value="fix"
-        ) as category_mock, mock.patch.object(
-            updater, "_maybe_commit_and_push"
-        ) as commit_mock, mock.patch.object(
-            updater, "_git_output", side_effect=fake_git_output
-        ):
-            updater.run_update(dry_run=False, use_ai=True, forced_ticket=None, verbose=False)
+        mocks = self._patch_many(
+            _gather_context_strings={"return_value": []},
+            _detect_ticket_id={"return_value": None},
+            _contexts_from_commit_history={"return_value": []},
+            enrich_and_classify={"side_effect": lambda title, *_: (f"AI:{title}", None)},
+            suggest_category={"return_value": "fix"},
+            _maybe_commit_and_push={},
+        )
+        self._patch_git("fedcba1", "fix: address issue")
 
-        commit_mock.assert_called_once()
-        content = Path("CHANGELOG.md").read_text(encoding="utf-8")
-        self.assertIn("CHANGE-fedcba1", content)
-        self.assertIn("AI:fix: address issue", content)
-        enhance_mock.assert_called()
-        category_mock.assert_called()
+        self._run_update(use_ai=True)
+
+        mocks["_maybe_commit_and_push"].assert_called_once()
+        content = self.changelog.read_bytes()
+        self.assertIn(b"CHANGE-fedcba1", content)
+        self.assertIn(b"AI:fix: address issue", content)
+        mocks["enrich_and_classify"].assert_called()
+        mocks["suggest_category"].assert_called()
 
     def test_run_update_dry_run_outputs_preview(self) -> None:
-        def fake_git_output(cmd):
-            joined = " ".join(cmd)
-            if "--pretty=%s" in joined:
-                return "feat: dry run"
-            if "rev-parse" in joined:
-                return "dryrun1"
-            return "placeholder"
-
-        with mock.patch.object(updater, "_gather_context_strings", return_value=[]), mock.patch.object(
-            updater, "_detect_ticket_id", return_value="FOK-DRY"
-        ), mock.patch.object(
-            updater, "get_ticket_summary", return_value={"title": "Dry"}
-        ), mock.patch.object(
-            updater, "_maybe_commit_and_push"
-        ), mock.patch.object(
-            updater, "_git_output", side_effect=fake_git_output
-        ), mock.patch("sys.stdout", new_callable=io.StringIO) as fake_stdout:
-            updater.run_update(dry_run=True, use_ai=False, forced_ticket=None, verbose=True)
+        mocks = self._patch_many(
+            _gather_context_strings={"return_value": []},
+            _detect_ticket_id={"return_value": "FOK-DRY"},
+            get_ticket_summary={"return_value": JiraTicket(title="Dry")},
+            _maybe_commit_and_push={},
+            _current_version={"return_value": "1.5"},
+        )
+        self.stack.enter_context(
+            mock.patch.object(updater.UpdateContext, "render_entry", return_value="- Dry (FOK-DRY, Alice, 2025-01-01)")
+        )
+        self._patch_git("dryrun1", "feat: dry run")
 
-        output = fake_stdout.getvalue()
-        self.assertIn("Dry", output)
+        with redirect_stdout(OutputSink()) as fake_stdout:
+            self._run_update(dry_run=True, verbose=True)
 
+        self.assertIn("- Dry (FOK-DRY, Alice, 2025-01-01)", fake_stdout.getvalue())
+        mocks["_maybe_commit_and_push"].assert_not_called()
 
-class AdditionalHelperTests(unittest.TestCase):
-    def setUp(self) -> None:
-        self.tmpdir = tempfile.TemporaryDirectory()
-        self.addCleanup(self.tmpdir.cleanup)
+    def test_run_update_dry_run_does_not_bootstrap_missing_changelog(self) -> None:
+        self.changelog.unlink()
+        self._patch_many(
+            _gather_context_strings={"return_value": []},
+            _detect_ticket_id={"return_value": "FOK-DRY"},
+            get_ticket_summary={"return_value": JiraTicket(title="Dry")},
+            _git_output={"return_value": _head_log("dryrun1", "feat: dry run")},
+        )
+
+        with redirect_stdout(OutputSink()) as fake_stdout:
+            self._run_update(dry_run=True)
+
+        self.assertFalse(self.changelog.exists())
+        self.assertIn("# Changelog", fake_stdout.getvalue())
+
+class AdditionalHelperTests(TempRootTestCase):
+    def _clear_branch_env(self) -> None:
+        """Unset the CI branch variables for the rest of the test."""
+        env_patch = mock.patch.dict(os.environ)
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+        for key in ["GITHUB_REF_NAME", "GITHUB_HEAD_REF", "CI_COMMIT_BRANCH", "CI_DEFAULT_BRANCH"]:
+            os.environ.pop(key, None)
 
     def test_current_version_fallback_parser(self) -> None:
-        temp = tempfile.TemporaryDirectory()
-        self.addCleanup(temp.cleanup)
-        cwd = Path.cwd()
-        try:
-            os.chdir(temp.name)
-            Path("manifest.yaml").write_text(
-                """# sample\nversion:\n  major: 4\n  minor: 2\n  prerelease: \"\"\n""",
-                encoding="utf-8",
-            )
-            original_yaml = updater.yaml
-            updater.yaml = None  # type: ignore[assignment]
-            self.assertEqual(updater._current_version(), "4.2")
-        finally:
-            updater.yaml = original_yaml
-            os.chdir(cwd)
+        path = self.base / "manifest.yaml"
+        path.write_text(
+            """# sample\nversion:\n  major: 4\n  minor: 2\n  prerelease: \"\"\n""",
+            encoding="utf-8",
+        )
+        with mock.patch.object(updater, "yaml", None):
+            self.assertEqual(updater._current_version(path), "4.2")
+
+    def test_parse_manifest_without_yaml_stops_at_next_top_level_key(self) -> None:
+        text = "version:\n  major: 3\n\n  # comment\n  prerelease: \"beta\"\nname: service\n  minor: 9\n"
+        self.assertEqual(
+            updater._parse_manifest_without_yaml(text),
+            {"version": {"major": 3, "prerelease": "beta"}},
+        )
 
     def test_current_version_read_failure(self) -> None:
-        path = Path("manifest.yaml")
+        path = self.base / "manifest.yaml"
         path.write_text("version:\n  major: 1\n  minor: 0\n", encoding="utf-8")
         with mock.patch.object(Path, "read_text", side_effect=OSError("boom")):
             self.assertEqual(updater._current_version(path), "0.0")
 
     def test_current_version_yaml_failure(self) -> None:
-        path = Path("manifest.yaml")
+        path = self.base / "manifest.yaml"
         path.write_text("version: : bad", encoding="utf-8")
         original_yaml = updater.yaml
         updater.yaml = mock.Mock()
-        updater.yaml.safe_load.side_effect = ValueError("bad")
+        updater.yaml.load.side_effect = ValueError("bad")
         try:
             self.assertEqual(updater._current_version(path), "0.0")
         finally:
             updater.yaml = original_yaml
 
     def test_current_version_missing_major_minor(self) -> None:
-        path = Path("manifest.yaml")
+        path = self.base / "manifest.yaml"
         path.write_text("version:\n  major: 1\n", encoding="utf-8")
         self.assertEqual(updater._current_version(path), "0.0")
 
@@ -416,9 +700,11 @@ class AdditionalHelperTests(unittest.TestCase):
         )
 
         with mock.patch.object(updater, "_git_output", return_value=log_output), mock.patch.object(
-            updater, "enhance_description", side_effect=lambda title, _: f"AI:{title}"
+            updater,
+            "enrich_and_classify_many",
+            side_effect=lambda items: [(f"AI:{title}", "feature") for title, _, _ in items],
         ), mock.patch.object(
-            updater, "suggest_category", side_effect=["feature", "fix"]
+            updater, "suggest_category", return_value="fix"
         ) as category_mock:
             contexts = updater._contexts_from_commit_history(set(), use_ai=True, limit=10)
 
@@ -427,9 +713,41 @@ class AdditionalHelperTests(unittest.TestCase):
         self.assertIn("CHANGE-abcdef1", ids)
         self.assertIn("CHANGE-bcdefa2", ids)
         self.assertTrue(all(ctx.title.startswith("AI:") for ctx in contexts))
-        self.assertEqual(category_mock.call_count, 2)
-        self.assertIn(contexts[0].category, {"feature", "fix"})
-        self.assertIn(contexts[1].category, {"feature", "fix"})
+        category_mock.assert_not_called()
+        self.assertEqual([ctx.category for ctx in contexts], ["feature", "feature"])
+
+    def test_contexts_from_commit_history_classifies_missing_categories_together(self) -> None:
+        log_output = (
+            "abcdef123456789\tadd api\tAlice\t2025-01-01\n"
+            "bcdefa234567890\tfix bug\tBob\t2025-01-02\n"
+            "cdefab345678901\ttweak\tCarol\t2025-01-03"
+        )
+
+        with mock.patch.object(updater, "_git_output", return_value=log_output), mock.patch.object(
+            updater,
+            "enrich_and_classify_many",
+            return_value=[("API", None), ("Bug", "fix"), ("Tweak", None)],
+        ), mock.patch.object(
+            updater, "suggest_categories_many", return_value=["feature", None]
+        ) as many_mock, mock.patch.object(updater, "suggest_category") as single_mock:
+            contexts = updater._contexts_from_commit_history(set(), use_ai=True, limit=10)
+
+        many_mock.assert_called_once()
+        self.assertEqual(len(many_mock.call_args.args[0]), 2)
+        single_mock.assert_not_called()
+        self.assertEqual([ctx.category for ctx in contexts], ["change", "fix", "feature"])
+
+    def test_contexts_from_commit_history_skips_malformed_and_stops_at_known(self) -> None:
+        log_output = (
+            "1111111aaaa\tfeat: newest\tAlice\t2025-01-03\n"
+            "garbage line\n"
+            "2222222bbbb\tsub\twith tab\tBob\t2025-01-02\n"
+            "3333333cccc\tfix: known\tCarol\t2025-01-01"
+        )
+        with mock.patch.object(updater, "_git_output", return_value=log_output):
+            contexts = updater._contexts_from_commit_history({"CHANGE-3333333"}, use_ai=False)
+
+        self.assertEqual([(ctx.ticket_id, ctx.author) for ctx in contexts], [("CHANGE-1111111", "Alice")])
 
     def test_resolve_category_uses_ai_override(self) -> None:
         with mock.patch.object(updater, "suggest_category", return_value="fix") as category_mock:
@@ -455,16 +773,103 @@ class AdditionalHelperTests(unittest.TestCase):
         category_mock.assert_called_once()
 
     def test_read_changelog_bootstraps(self) -> None:
-        temp_path = Path(self.tmpdir.name) / "NEW_CHANGELOG.md"
+        temp_path = self.base / "NEW_CHANGELOG.md"
         content = updater._read_changelog(temp_path)
         self.assertTrue(temp_path.exists())
         self.assertIn("# Changelog", content)
 
+    def test_categorize_commit_titles(self) -> None:
+        self.assertEqual(updater._categorize("Feature: add export"), "feature")
+        self.assertEqual(updater._categorize("fix: handle feat: prefix"), "feature")
+        self.assertEqual(updater._categorize("chore: fix: typo"), "fix")
+        self.assertEqual(updater._categorize("Fixes crash"), "fix")
+        self.assertEqual(updater._categorize("refactor parser"), "change")
+        self.assertEqual(updater._categorize(""), "change")
+
+    def test_categorize_from_labels_priority(self) -> None:
+        self.assertEqual(updater._categorize_from_labels(["Feature-Bug"]), "fix")
+        self.assertEqual(updater._categorize_from_labels(["Fixed-in-2.0"]), "fix")
+        self.assertEqual(updater._categorize_from_labels(["feat-x", "bug"]), "feature")
+        self.assertEqual(updater._categorize_from_labels(["team-a", "Documentation"]), "change")
+        self.assertIsNone(updater._categorize_from_labels(["team-a", "prefix"]))
+        self.assertIsNone(updater._categorize_from_labels([]))
+
+    def test_extract_existing_ids(self) -> None:
+        content = "- A (CHANGE-abc1234, X, d)\n- B (CHANGE-abc1234, Y, d)\n- C (CHANGE-, Z)\nCHANGE-Ff9\u00e9"
+        self.assertEqual(updater._extract_existing_ids(content), {"CHANGE-abc1234", "CHANGE-Ff9"})
+        self.assertEqual(updater._extract_existing_ids(""), set())
+
+    def test_write_changelog_replaces_atomically_and_keeps_mode(self) -> None:
+        path = self.base / "CHANGELOG.md"
+        path.write_text("old\n", encoding="utf-8")
+        os.chmod(path, 0o640)
+
+        updater._write_changelog(path, "new\n")
+
+        self.assertEqual(path.read_text(encoding="utf-8"), "new\n")
+        self.assertEqual(path.stat().st_mode & 0o777, 0o640)
+        self.assertEqual(sorted(p.name for p in self.base.iterdir()), ["CHANGELOG.md"])
+
+    def test_write_changelog_new_file_follows_umask(self) -> None:
+        path = self.base / "CHANGELOG.md"
+        previous = os.umask(0o027)
+        try:
+            with mock.patch.object(updater.os, "umask", side_effect=AssertionError("umask changed")):
+                updater._write_changelog(path, "new\n")
+        finally:
+            os.umask(previous)
+
+        self.assertEqual(path.stat().st_mode & 0o777, 0o640)
+
+    @unittest.skipIf(os.name == "nt", "symlinks need extra privileges on Windows")
+    def test_write_changelog_updates_symlink_target(self) -> None:
+        target = self.base / "docs" / "CHANGELOG.md"
+        target.parent.mkdir()
+        target.write_text("old\n", encoding="utf-8")
+        link = self.base / "CHANGELOG.md"
+        link.symlink_to(target)
+
+        updater._write_changelog(link, "new\n")
+
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(target.read_text(encoding="utf-8"), "new\n")
+        self.assertEqual(sorted(p.name for p in target.parent.iterdir()), ["CHANGELOG.md"])
+
+    def test_read_changelog_normalises_crlf(self) -> None:
+        path = self.base / "CHANGELOG.md"
+        path.write_bytes("# Changelog\r\n\r\n## 1.0 \u2013 r\u00e9sum\u00e9\r\n".encode("utf-8"))
+
+        self.assertEqual(updater._read_changelog(path), "# Changelog\n\n## 1.0 \u2013 r\u00e9sum\u00e9\n")
+
+    def test_write_changelog_failure_keeps_original(self) -> None:
+        path = self.base / "CHANGELOG.md"
+        path.write_text("old\n", encoding="utf-8")
+
+        with mock.patch.object(updater.os, "replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                updater._write_changelog(path, "new\n")
+
+        self.assertEqual(path.read_text(encoding="utf-8"), "old\n")
+        self.assertEqual(sorted(p.name for p in self.base.iterdir()), ["CHANGELOG.md"])
+
     def test_detect_ticket_id_variants(self) -> None:
         self.assertEqual(updater._detect_ticket_id("ABC-1", []), "ABC-1")
         self.assertIsNone(updater._detect_ticket_id("bad-format", []))
         self.assertEqual(updater._detect_ticket_id(None, ["feat ABC-2"]), "ABC-2")
         self.assertIsNone(updater._detect_ticket_id(None, []))
+        buried = "x" * updater.TICKET_SCAN_LIMIT + " ABC-3"
+        self.assertEqual(updater._detect_ticket_id(None, [buried, "ABC-4"]), "ABC-4")
+        straddling = "x" * (updater.TICKET_SCAN_LIMIT - 6) + " ABC-123456"
+        self.assertEqual(updater._detect_ticket_id(None, [straddling, "ABC-5"]), "ABC-5")
+        within = "x" * (updater.TICKET_SCAN_LIMIT - 6) + " ABC-1 tail"
+        self.assertEqual(updater._detect_ticket_id(None, [within, "ABC-5"]), "ABC-1")
+        self.assertEqual(updater._detect_ticket_id(None, ["", "no id", "see XY-9 then AB-1", "AB-2"]), "XY-9")
+        self.assertIsNone(updater._detect_ticket_id(None, ["AB", "-1"]))
+
+    def test_detect_ticket_id_skips_regex_without_hyphen(self) -> None:
+        with mock.patch.object(updater, "TICKET_PATTERN") as pattern_mock:
+            self.assertIsNone(updater._detect_ticket_id(None, ["chore: tidy imports", "main"]))
+        pattern_mock.search.assert_not_called()
 
     def test_ensure_version_block_inserts_after_header(self) -> None:
         content = "# Changelog\n\n## 0.9\n"
@@ -473,121 +878,174 @@ class AdditionalHelperTests(unittest.TestCase):
         self.assertIn("## 0.10", updated)
 
     def test_maybe_commit_skip_env_variable(self) -> None:
-        os.environ["SMART_CHANGELOG_SKIP_COMMIT"] = "1"
-        try:
+        with mock.patch.dict(os.environ, {"SMART_CHANGELOG_SKIP_COMMIT": "1"}), mock.patch.object(
+            updater, "_git_available"
+        ) as git_available_mock:
             updater._maybe_commit_and_push("CHANGELOG.md", "entry")
-        finally:
-            os.environ.pop("SMART_CHANGELOG_SKIP_COMMIT", None)
+        git_available_mock.assert_not_called()
 
     def test_current_branch_prefers_env(self) -> None:
-        os.environ["GITHUB_REF_NAME"] = "feature"
-        self.addCleanup(lambda: os.environ.pop("GITHUB_REF_NAME", None))
-        self.assertEqual(updater._current_branch(), "feature")
+        with mock.patch.dict(os.environ, {"GITHUB_REF_NAME": "feature"}):
+            self.assertEqual(updater._current_branch(), "feature")
 
     def test_current_branch_falls_back_to_git(self) -> None:
-        for key in ["GITHUB_REF_NAME", "GITHUB_HEAD_REF", "CI_COMMIT_BRANCH", "CI_DEFAULT_BRANCH"]:
-            os.environ.pop(key, None)
+        self._clear_branch_env()
         with mock.patch.object(updater, "_git_output", return_value="main"):
             self.assertEqual(updater._current_branch(), "main")
 
+    def test_current_branch_reuses_head_metadata(self) -> None:
+        self._clear_branch_env()
+        with mock.patch.object(updater, "_git_output") as git_mock:
+            self.assertEqual(updater._current_branch(updater.HeadCommit(branch="release")), "release")
+            self.assertIsNone(updater._current_branch(updater.HeadCommit(branch="HEAD")))
+        git_mock.assert_not_called()
+
+    def test_ci_env_snapshot_is_shared_by_helpers(self) -> None:
+        env = updater.CiEnv({"GITHUB_REF_NAME": "topic", "GIT_AUTHOR_NAME": "Env Author", "BRANCH_NAME": "FOK-7"})
+        head = updater.HeadCommit(author="Git User", branch="main", message="msg")
+        with mock.patch.dict(os.environ, {"GITHUB_REF_NAME": "ignored"}):
+            self.assertEqual(updater._current_branch(head, env), "topic")
+            self.assertEqual(updater._detect_author(head, env), "Env Author")
+            self.assertEqual(updater._gather_context_strings(head, env), ["topic", "FOK-7", "msg", "main"])
+
     def test_detect_author_prefers_env(self) -> None:
-        os.environ["CI_COMMIT_AUTHOR"] = "CI Bot"
-        self.addCleanup(lambda: os.environ.pop("CI_COMMIT_AUTHOR", None))
-        self.assertEqual(updater._detect_author(), "CI Bot")
+        with mock.patch.dict(os.environ, {"CI_COMMIT_AUTHOR": "CI Bot"}):
+            self.assertEqual(updater._detect_author(), "CI Bot")
 
     def test_detect_author_falls_back_to_git(self) -> None:
-        with mock.patch.object(updater, "_git_output", return_value="Git User"):
+        with mock.patch.object(updater, "_git_output", return_value=_head_log("abc1234", "feat", "Git User")):
             self.assertEqual(updater._detect_author(), "Git User")
 
     def test_gather_context_strings_collects_git_metadata(self) -> None:
-        with mock.patch.object(updater, "_git_output", side_effect=["message", "branch"]):
+        head_log = _head_log("abc1234", "message", refs="HEAD -> branch, origin/branch")
+        with mock.patch.object(updater, "_git_output", return_value=head_log) as git_mock:
             contexts = updater._gather_context_strings()
-        self.assertIn("message", contexts)
+        git_mock.assert_called_once()
+        self.assertIn("message\n\nBody", contexts)
         self.assertIn("branch", contexts)
 
+    def test_head_commit_reports_detached_head(self) -> None:
+        with mock.patch.object(updater, "_git_output", return_value=_head_log("abc1234", "msg", refs="HEAD, tag: v1")):
+            head = updater._head_commit()
+        self.assertEqual(head.branch, "HEAD")
+        self.assertEqual(head.subject, "msg")
+
+    def test_head_commit_without_git(self) -> None:
+        with mock.patch.object(updater, "_git_output", return_value=None):
+            self.assertEqual(updater._head_commit(), updater.HeadCommit())
+
     def test_fallback_ticket_identifier_uses_git(self) -> None:
-        with mock.patch.object(updater, "_git_output", return_value="abc1234"):
+        with mock.patch.object(updater, "_git_output", return_value=_head_log("abc1234", "feat")):
             self.assertEqual(updater._fallback_ticket_identifier(), "CHANGE-abc1234")
 
     def test_fallback_ticket_identifier_without_git(self) -> None:
         with mock.patch.object(updater, "_git_output", return_value=None):
             self.assertEqual(updater._fallback_ticket_identifier(), "CHANGE-NOREF")
 
+    def test_git_output_disables_optional_locks(self) -> None:
+        completed = subprocess.CompletedProcess(["git"], 0, stdout=" out \n", stderr="")
+        with mock.patch.object(updater.subprocess, "run", return_value=completed) as run_mock:
+            self.assertEqual(updater._git_output(["git", "status"]), "out")
+        self.assertEqual(run_mock.call_args.kwargs["env"]["GIT_OPTIONAL_LOCKS"], "0")
+
+    def test_git_available_is_probed_once(self) -> None:
+        updater._git_available.cache_clear()
+        self.addCleanup(updater._git_available.cache_clear)
+        with mock.patch.object(updater.shutil, "which", return_value="/usr/bin/git") as which_mock, mock.patch(
+            "subprocess.call"
+        ) as call_mock:
+            self.assertTrue(updater._git_available())
+            self.assertTrue(updater._git_available())
+        which_mock.assert_called_once_with("git")
+        call_mock.assert_not_called()
+
+        updater._git_available.cache_clear()
+        with mock.patch.object(updater.shutil, "which", return_value=None):
+            self.assertFalse(updater._git_available())
+
+    def test_today_utc_matches_datetime(self) -> None:
+        self.assertEqual(updater._today_utc(), datetime.now(timezone.utc).date().isoformat())
+
     def test_first_non_empty(self) -> None:
         self.assertEqual(updater._first_non_empty(["", " value "]), "value")
         self.assertEqual(updater._first_non_empty([]), "")
 
+    def _install_fake_git(self, branch: Optional[str] = None) -> FakeGit:
+        """Route ``subprocess.run`` through one FakeGit for the rest of the test, with git available."""
+        git = FakeGit()
+        self.branch_mock = mock.Mock(return_value=branch)
+        for patcher in (
+            mock.patch("subprocess.run", side_effect=git),
+            mock.patch.object(updater, "_git_available", return_value=True),
+            mock.patch.object(updater, "_current_branch", self.branch_mock),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return git
+
     def test_maybe_commit_and_push_happy_path(self) -> None:
-        calls: list[list[str]] = []
-
-        def fake_run(cmd, check=False, stdout=None, stderr=None, env=None):
-            calls.append(cmd)
-            if cmd[:2] == ["git", "add"]:
-                return subprocess.CompletedProcess(cmd, 0)
-            if cmd[:3] == ["git", "diff", "--cached"]:
-                return subprocess.CompletedProcess(cmd, 1)
-            if cmd[:2] == ["git", "commit"]:
-                return subprocess.CompletedProcess(cmd, 0)
-            if cmd[:2] == ["git", "push"]:
-                return subprocess.CompletedProcess(cmd, 0)
-            return subprocess.CompletedProcess(cmd, 0)
-
-        with mock.patch.object(updater, "_git_available", return_value=True), mock.patch.object(
-            updater, "_current_branch", return_value="main"
-        ), mock.patch("subprocess.run", side_effect=fake_run):
-            updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        git = self._install_fake_git(branch="main")
+        git.replies[DIFF_CACHED] = 1
+        updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+
+        self.assertEqual(
+            git.calls,
+            [
+                ["git", "add", "CHANGELOG.md"],
+                list(DIFF_CACHED),
+                [*COMMIT, "--only", "CHANGELOG.md"],
+                ["git", "push", "origin", "main"],
+            ],
+        )
 
-        self.assertGreaterEqual(len(calls), 4)
+    def test_maybe_commit_skips_staged_diff_probe_when_changed(self) -> None:
+        git = self._install_fake_git()
 
-    def test_maybe_commit_handles_failures(self) -> None:
-        with mock.patch.object(updater, "_git_available", return_value=False):
-            updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        updater._maybe_commit_and_push("CHANGELOG.md", "entry", changed=True)
 
-        def raise_on_add(cmd, **kwargs):
-            raise subprocess.CalledProcessError(1, cmd)
+        self.assertEqual(git.calls, [list(LS_FILES), [*COMMIT, "--only", "CHANGELOG.md"]])
 
-        with mock.patch.object(updater, "_git_available", return_value=True), mock.patch("subprocess.run", side_effect=raise_on_add):
-            updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+    def test_maybe_commit_adds_untracked_changelog_before_committing(self) -> None:
+        git = self._install_fake_git()
+        git.replies[LS_FILES] = 1
 
-        sequence = [
-            subprocess.CompletedProcess(["git", "add"], 0),
-            subprocess.CompletedProcess(["git", "diff", "--cached", "--quiet"], 0),
-        ]
+        with mock.patch.dict(os.environ, {"SMART_CHANGELOG_NO_VERIFY": "1"}):
+            updater._maybe_commit_and_push("CHANGELOG.md", "entry", changed=True)
 
-        def fake_run_no_changes(cmd, **kwargs):
-            return sequence.pop(0)
+        self.assertEqual(
+            git.calls,
+            [
+                list(LS_FILES),
+                ["git", "add", "CHANGELOG.md"],
+                [*COMMIT, "--no-verify", "--only", "CHANGELOG.md"],
+            ],
+        )
 
-        with mock.patch.object(updater, "_git_available", return_value=True), mock.patch("subprocess.run", side_effect=fake_run_no_changes):
+    def test_maybe_commit_without_git_does_nothing(self) -> None:
+        with mock.patch.object(updater, "_git_available", return_value=False), mock.patch("subprocess.run") as run_mock:
             updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        run_mock.assert_not_called()
 
-        def sequence_commit_fail(cmd, **kwargs):
-            if cmd[:2] == ["git", "add"]:
-                return subprocess.CompletedProcess(cmd, 0)
-            if cmd[:3] == ["git", "diff", "--cached", "--quiet"]:
-                return subprocess.CompletedProcess(cmd, 1)
-            if cmd[:2] == ["git", "commit"]:
-                raise subprocess.CalledProcessError(1, cmd)
-            return subprocess.CompletedProcess(cmd, 0)
+    def test_maybe_commit_handles_failures(self) -> None:
+        git = self._install_fake_git()
 
-        with mock.patch.object(updater, "_git_available", return_value=True), mock.patch("subprocess.run", side_effect=sequence_commit_fail):
-            updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        git.replies = {("git", "add"): 1}
+        updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        self.assertEqual(git.calls, [["git", "add", "CHANGELOG.md"]])
 
-        def sequence_push_fail(cmd, **kwargs):
-            if cmd[:2] == ["git", "add"]:
-                return subprocess.CompletedProcess(cmd, 0)
-            if cmd[:3] == ["git", "diff", "--cached", "--quiet"]:
-                return subprocess.CompletedProcess(cmd, 1)
-            if cmd[:2] == ["git", "commit"]:
-                return subprocess.CompletedProcess(cmd, 0)
-            if cmd[:2] == ["git", "push"]:
-                raise subprocess.CalledProcessError(1, cmd)
-            return subprocess.CompletedProcess(cmd, 0)
-
-        with mock.patch.object(updater, "_git_available", return_value=True), mock.patch.object(
-            updater, "_current_branch", return_value="main"
-        ), mock.patch("subprocess.run", side_effect=sequence_push_fail):
-            updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        git.replies, git.calls = {DIFF_CACHED: 0}, []
+        updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        self.assertEqual(git.calls[-1], list(DIFF_CACHED))
 
+        git.replies = {DIFF_CACHED: 1, ("git", "commit"): 1}
+        updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        self.branch_mock.assert_not_called()
+
+        git.replies = {DIFF_CACHED: 1, ("git", "push"): 1}
+        self.branch_mock.return_value = "main"
+        with self.assertLogs(updater.LOGGER, level="WARNING") as logs:
+            updater._maybe_commit_and_push("CHANGELOG.md", "entry")
+        self.assertIn("exited with status 1", logs.output[-1])
 
 if __name__ == "__main__":
     unittest.main()